@@ -1,6 +1,13 @@
 # serving/api.py
 import sys
 import os
+import time
+import json
+import base64
+import hashlib
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import warnings
 import logging
 
@@ -13,15 +20,30 @@ logging.getLogger("transformers").setLevel(logging.ERROR)
 # Add the parent directory to sys.path to resolve 'storage' module
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 from datetime import datetime
-from storage.db import get_recent_books, get_books_by_ids
-from transformation.embedder import load_model, load_embeddings
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
+from storage.db import get_recent_books, get_books_by_ids, get_book_ids_by_genres, get_books_page, get_book_neighbors, book_cache
+from storage.cache import LRUCache
+from storage.version import current_catalog_version, VersionedResource
+from monitoring.metrics import (
+    REQUESTS, ERRORS, REQUEST_LATENCY, INDEX_SIZE,
+    MODEL_LOAD_SECONDS, PENDING_SEARCHES, record_cache_stats, render_metrics
+)
+from monitoring.tracing import SearchTrace
+from search.vector_index import search_vectors, candidate_vectors
+from search.ranking import mmr_order, unique_books, boost_entity_matches, DEFAULT_MMR_LAMBDA, RESULTS_DEPTH
+from search.fuzzy_index import build_trigram_index
+from search.suggest_index import build_prefix_index, DEFAULT_SUGGESTIONS, MAX_SUGGESTIONS
+from search.query_understanding import get_query_parser
+from search.knn_graph import KNN_NEIGHBORS
+# NOTE: the embedder (torch / onnxruntime) is imported lazily by the warm-up thread so
+# the process can answer liveness checks before ML resources exist. NumPy and the
+# index/ranking modules are cheap (~0.1 s) and imported here.
 
 # --- METADATA ---
 tags_metadata = [
@@ -50,6 +72,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template (not raw path) to keep series cardinality bounded
+        route = request.scope.get("route")
+        endpoint = route.path if route is not None else "unmatched"
+        REQUEST_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint)
+        REQUESTS.inc(endpoint=endpoint, status=status)
+        if status >= 500:
+            ERRORS.inc(endpoint=endpoint)
+
 # --- MODELS ---
 class Book(BaseModel):
     id: int = Field(..., description="Unique database identifier")
@@ -62,6 +101,7 @@ class Book(BaseModel):
     publish_year: Optional[str] = Field(None, description="Year of publication")
     source: Optional[str] = Field(None, description="Data source (e.g. OpenLibrary)")
     created_at: Optional[str] = Field(None, description="Record creation timestamp")
+    score: Optional[float] = Field(None, description="Similarity to the query or source book (search and similar-book results only)")
     
     class Config:
         json_schema_extra = {
@@ -78,33 +118,130 @@ class SearchResponse(BaseModel):
     query: str
     results: List[Book]
     count: int
+    next_offset: Optional[int] = Field(None, description="`offset` of the next page, or null on the last page")
+    filters: Dict[str, Any] = Field(default_factory=dict, description="Applied `genre` filter and the query `keywords` it was detected from, if any")
+    explain: Optional[Dict[str, Any]] = Field(None, description="Stage timings and search statistics (only with `explain=true`)")
+
+class Suggestion(BaseModel):
+    text: str
+    type: str = Field(..., description="`title`, `author` or `genre`")
+    weight: int = Field(..., description="Books sharing this title, author or genre")
+
+class SuggestResponse(BaseModel):
+    query: str
+    suggestions: List[Suggestion]
+
+class BookPage(BaseModel):
+    results: List[Book]
+    count: int
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` to fetch the next page; null on the last page")
 
 # --- RESOURCES ---
-# Load ML models on startup (or lazy load)
-# Note: In a real production app, use Lifespan events
+# ML resources are loaded by a background warm-up thread so startup never blocks
 model = None
 embeddings_data = None
+id_array = None  # embeddings_data['ids'] as an ndarray, built once
+ml_state = "loading"  # loading -> ready | failed
+model_load_seconds = None
+# Fuzzy title/author lookup, rebuilt in the background when the catalog changes
+fuzzy_index = VersionedResource("trigram index", build_trigram_index)
+# Typeahead prefix index, same lifecycle
+suggest_index = VersionedResource("prefix index", build_prefix_index)
+# Title/author matches checked per search for entity boosting
+ENTITY_LOOKUP_LIMIT = 5
 
-@app.on_event("startup")
-def load_resources():
-    global model, embeddings_data
+def warm_up_resources():
+    """
+    Loads the encoder and embeddings, then runs one throwaway encode
+    so the first real query doesn't pay for lazy initialisation.
+    """
+    global model, embeddings_data, id_array, ml_state, model_load_seconds
+    start = time.perf_counter()
     try:
-        model = load_model()
-        embeddings_data = load_embeddings()
-        print("✅ ML Resources Loaded")
+        from transformation.embedder import load_model, load_embeddings
+        loaded_model = load_model()
+        loaded_embeddings = load_embeddings()
+        loaded_model.encode(["warm up"], normalize_embeddings=True)
+
+        id_array = np.asarray(loaded_embeddings.get('ids', []))
+        model, embeddings_data = loaded_model, loaded_embeddings
+        model_load_seconds = time.perf_counter() - start
+        ml_state = "ready" if embeddings_data else "failed"
+        print(f"✅ ML Resources Loaded in {model_load_seconds:.1f}s")
     except Exception as e:
+        ml_state = "failed"
         print(f"⚠️ Warning: utilizing fallback (No ML): {e}")
+    fuzzy_index.get()
+    suggest_index.get()
+
+@app.on_event("startup")
+def load_resources():
+    threading.Thread(target=warm_up_resources, name="ml-warmup", daemon=True).start()
+
+# --- EXECUTORS ---
+# CPU-bound work (encoding + vector scan) and SQLite I/O get separate, bounded pools
+# so neither can starve the other or the event loop.
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "2"))
+IO_WORKERS = int(os.environ.get("IO_WORKERS", "8"))
+# Admission control: searches beyond this many in flight are rejected with 503
+MAX_PENDING_SEARCHES = int(os.environ.get("MAX_PENDING_SEARCHES", "32"))
+OVERLOAD_RETRY_AFTER = "1"
+
+inference_pool = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="db-io")
+pending_searches = 0  # only touched on the event loop thread
+
+# --- SEARCH RESPONSE CACHE ---
+# Serialized /search responses keyed on normalized parameters + catalog version
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", "2048"))
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", "300"))
+# Cache-Control max-age advertised to clients and proxies
+SEARCH_CACHE_MAX_AGE = int(os.environ.get("SEARCH_CACHE_MAX_AGE", "60"))
+
+search_cache = LRUCache(SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+# Ranked candidate rows + scores per query, so later pages re-rank without searching again
+ranked_cache = LRUCache(SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+_search_cache_version = {"value": None}
+
+def ranked_cache_key(q: str, genre: Optional[List[str]]):
+    """
+    Normalizes the query and filters so equivalent requests share one ranking.
+    """
+    normalized_q = " ".join(q.lower().split())
+    genres = tuple(sorted({g.strip().lower() for g in genre or [] if g.strip()}))
+    return (normalized_q, genres)
+
+def search_cache_key(q: str, limit: int, genre: Optional[List[str]], mmr_lambda: float = DEFAULT_MMR_LAMBDA, offset: int = 0):
+    """
+    Normalizes search parameters so equivalent requests share one entry.
+    """
+    return (*ranked_cache_key(q, genre), limit, offset, round(mmr_lambda, 3))
+
+def cached_search_response(body: bytes, etag: str, status_code: int = 200) -> Response:
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={SEARCH_CACHE_MAX_AGE}",
+    }
+    if status_code == 304:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.on_event("shutdown")
+def shutdown_executors():
+    inference_pool.shutdown(wait=False)
+    io_pool.shutdown(wait=False)
 
 # --- ENDPOINTS ---
 
 @app.get("/", tags=["System"])
 def health_check():
     """
-    **Health Check**
+    **Health Check (liveness)**
     
     Returns the operational status of the API and loaded models.
+    Always answers immediately, even while models are still warming up.
     """
-    ml_status = "active" if (model and embeddings_data) else "inactive"
+    ml_status = "active" if ml_state == "ready" else ("loading" if ml_state == "loading" else "inactive")
     return {
         "status": "online", 
         "version": "1.0.0",
@@ -112,6 +249,37 @@ def health_check():
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/ready", tags=["System"])
+def readiness_check():
+    """
+    **Readiness Check**
+    
+    Returns 200 once the search engine can serve queries, 503 otherwise.
+    Point load balancers here; keep liveness probes on `/`.
+    """
+    body = {
+        "ready": ml_state == "ready",
+        "ml_engine": ml_state,
+        "model_load_seconds": model_load_seconds,
+    }
+    return JSONResponse(status_code=200 if body["ready"] else 503, content=body)
+
+@app.get("/metrics", tags=["System"], response_class=PlainTextResponse)
+def metrics_endpoint():
+    """
+    **Metrics**
+    
+    Prometheus text exposition: request counts, errors, latency histograms
+    (overall and per search stage), cache hit ratios, index size and model load time.
+    """
+    record_cache_stats("search", search_cache.stats())
+    record_cache_stats("books", book_cache.stats())
+    INDEX_SIZE.set(len(id_array) if id_array is not None else 0)
+    if model_load_seconds is not None:
+        MODEL_LOAD_SECONDS.set(model_load_seconds)
+    PENDING_SEARCHES.set(pending_searches)
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/books/recent", response_model=List[Book], tags=["Books"])
 def get_recent_books_endpoint(limit: int = Query(10, ge=1, le=100, description="Number of books to return (1-100)")):
     """
@@ -125,10 +293,175 @@ def get_recent_books_endpoint(limit: int = Query(10, ge=1, le=100, description="
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def encode_cursor(key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, book_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(created_at), int(book_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@app.get("/books", response_model=BookPage, tags=["Books"])
+def list_books_endpoint(
+    limit: int = Query(20, ge=1, le=500, description="Page size (1-500)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's `next_cursor`"),
+    genre: Optional[str] = Query(None, description="Genre substring (case-insensitive)"),
+    author: Optional[str] = Query(None, description="Exact author name"),
+    source: Optional[str] = Query(None, description="Data source, e.g. `csv` or `openlibrary`"),
+    publish_year: Optional[str] = Query(None, description="Exact publication year")
+):
+    """
+    **List Books**
+    
+    Browses the whole catalog, newest first, with keyset (cursor) pagination.
+    Every page costs the same no matter how deep you go.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    try:
+        books, last_key = get_books_page(
+            limit=limit, after=after, genre=genre, author=author, source=source, publish_year=publish_year
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "results": books,
+        "count": len(books),
+        "next_cursor": encode_cursor(last_key) if last_key else None
+    }
+
+@app.get("/books/{book_id}/similar", response_model=List[Book], tags=["Books"])
+def similar_books_endpoint(
+    book_id: int,
+    limit: int = Query(10, ge=1, le=KNN_NEIGHBORS, description=f"Number of similar books (1-{KNN_NEIGHBORS})")
+):
+    """
+    **More Like This**
+    
+    Returns the books closest in meaning to the given one, best first.
+    Neighbours are precomputed by the embedding stage, so this is one indexed read
+    plus hydration; books added since the last pipeline run have no list yet.
+    """
+    try:
+        neighbors = get_book_neighbors(book_id, limit)
+        if not neighbors and not get_books_by_ids([book_id]):
+            raise HTTPException(status_code=404, detail="Book not found")
+
+        books = get_books_by_ids([neighbor_id for neighbor_id, _ in neighbors], aligned=True)
+        return [{**book, "score": round(score, 4)} for book, (_, score) in zip(books, neighbors) if book]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/suggest", response_model=SuggestResponse, tags=["Search"])
+def suggest_endpoint(
+    q: str = Query(..., min_length=1, description="What the user has typed so far"),
+    limit: int = Query(DEFAULT_SUGGESTIONS, ge=1, le=MAX_SUGGESTIONS)
+):
+    """
+    **Typeahead Suggestions**
+    
+    Titles, authors and genres with a word starting with `q`, most popular first.
+    Served from an in-memory prefix index, rebuilt when the catalog changes.
+    """
+    index = suggest_index.get()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Suggestion index warming up", headers={"Retry-After": "5"})
+    return {"query": q, "suggestions": index.suggest(q, limit)}
+
+@app.get("/books/lookup", response_model=List[Book], tags=["Books"])
+def fuzzy_lookup_endpoint(
+    q: str = Query(..., min_length=2, description="Title or author, typos allowed"),
+    field: Optional[str] = Query(None, pattern="^(title|author)$", description="Restrict to `title` or `author`"),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """
+    **Fuzzy Title / Author Lookup**
+    
+    Finds books by approximate title or author name (e.g. "agatha cristie"),
+    ranked by trigram similarity, which is returned as `score`.
+    """
+    index = fuzzy_index.get()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Lookup index warming up", headers={"Retry-After": "5"})
+
+    try:
+        scored: Dict[int, float] = {}
+        for match in index.lookup(q, limit, field=field):
+            for book_id in match['book_ids']:
+                scored.setdefault(book_id, match['similarity'])
+        ids = list(scored)[:limit]
+        return [{**book, "score": scored[book['id']]} for book in get_books_by_ids(ids)]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def genre_candidate_rows(genres: List[str], trace: SearchTrace):
+    """
+    Row indices of the embedding matrix whose books match any of the genres (I/O pool).
+    """
+    with trace.span("filter"):
+        allowed_ids = get_book_ids_by_genres(genres)
+        rows = np.flatnonzero(np.isin(id_array, allowed_ids))
+    trace.set(filter_matches=len(rows), filter_selectivity=round(len(rows) / max(len(id_array), 1), 6))
+    return rows
+
+def rank_query(q: str, top_k: int, candidate_indices, trace: SearchTrace):
+    """
+    Encodes the query and scans the index (inference pool).
+    Returns (index rows, scores), best first.
+    """
+    with trace.span("encode"):
+        query_vec = model.encode([q], normalize_embeddings=True)[0]
+    with trace.span("scan"):
+        top_indices, scores = search_vectors(embeddings_data, query_vec, top_k, candidate_indices)
+    trace.set(
+        candidates_scanned=len(id_array) if candidate_indices is None else len(candidate_indices),
+        candidates_ranked=len(top_indices),
+    )
+
+    # Queries naming a title or author (even misspelled) pull that book up
+    index = fuzzy_index.get()
+    if index is not None:
+        with trace.span("entity"):
+            matches = index.lookup(q, ENTITY_LOOKUP_LIMIT)
+            top_indices, scores = boost_entity_matches(
+                embeddings_data, id_array, query_vec, top_indices, scores, matches, candidate_indices
+            )
+        trace.set(entity_matches=[(m['field'], m['value'], m['similarity']) for m in matches[:3]])
+    return np.asarray(top_indices, dtype=np.int64), np.asarray(scores, dtype=np.float32)
+
+def rerank_page(rows, scores, offset: int, limit: int, mmr_lambda: float, trace: SearchTrace):
+    """
+    MMR order of the ranked candidates, sliced to one page (inference pool).
+    Greedy MMR picks don't depend on how many are asked for, so pages never overlap.
+    Returns (book ids, scores, whether more candidates remain) for the page.
+    """
+    with trace.span("rerank"):
+        order = mmr_order(candidate_vectors(embeddings_data, rows), scores, offset + limit, mmr_lambda)
+    has_more = len(order) == offset + limit and offset + limit < len(rows)
+    page = order[offset:]
+    return id_array[rows[page]], scores[page], has_more
+
+def hydrate_books(ids: List[int], trace: SearchTrace):
+    """
+    Book rows aligned with ids (I/O pool).
+    """
+    with trace.span("hydrate"):
+        return get_books_by_ids(ids, aligned=True)
+
 @app.get("/search", response_model=SearchResponse, tags=["Search"])
-def semantic_search_endpoint(
+async def semantic_search_endpoint(
+    request: Request,
     q: str = Query(..., min_length=3, description="Natural language search query"),
-    limit: int = Query(10, ge=1, le=50)
+    limit: int = Query(10, ge=1, le=50),
+    offset: int = Query(0, ge=0, lt=RESULTS_DEPTH, description="Results to skip; pass the previous page's `next_offset`"),
+    genre: Optional[List[str]] = Query(None, description="Restrict to books whose genre contains any of these"),
+    mmr_lambda: float = Query(DEFAULT_MMR_LAMBDA, ge=0, le=1, alias="lambda", description="Relevance vs. diversity trade-off (1 = relevance only)"),
+    detect: bool = Query(True, description="Filter by genres mentioned in the query when `genre` is not given"),
+    explain: bool = Query(False, description="Include stage timings and candidate statistics in the response")
 ):
     """
     **Semantic Search**
@@ -137,49 +470,110 @@ def semantic_search_endpoint(
     
     - **q**: Your search query (e.g., "apocalyptic robot futures")
     - **limit**: Max results to return
+    - **offset**: Page start within the query's ranked results (see `next_offset`)
+    - **genre**: Optional genre substrings (repeatable) for hard filtering
+    - **detect**: Without `genre`, genre keywords in the query (e.g. "sci-fi") become the filter
+    - **lambda**: MMR re-ranking weight; lower values trade relevance for more varied results
+    - **explain**: Adds an `explain` section (bypasses the response cache)
+    
+    The query is ranked once (top RESULTS_DEPTH candidates) and every page is a slice of
+    the same MMR order, so paging never reorders or repeats results.
+    Returns 503 with `Retry-After` when too many searches are already in flight.
+    Responses carry `ETag` / `Cache-Control`; popular queries are served from an in-process cache.
+    Stage timings are always sent in the `Server-Timing` header.
     """
+    global pending_searches
+
+    if ml_state == "loading":
+        raise HTTPException(status_code=503, detail="Search engine warming up", headers={"Retry-After": "5"})
     if not model or not embeddings_data:
         raise HTTPException(status_code=503, detail="Search engine not ready (embeddings missing)")
-        
+
+    # Drop every cached response once the pipeline publishes a new catalog version
+    version = current_catalog_version()
+    if version != _search_cache_version["value"]:
+        search_cache.clear()
+        ranked_cache.clear()
+        _search_cache_version["value"] = version
+
+    # Query understanding: genre keywords in the query act as a filter unless one was given
+    filters: Dict[str, Any] = {"genre": genre} if genre else {}
+    if not genre and detect:
+        parsed = get_query_parser().parse(q)
+        if parsed["genres"]:
+            genre = parsed["genres"]
+            filters = {"genre": genre, "keywords": parsed["keywords"]}
+
+    cache_key = search_cache_key(q, limit, genre, mmr_lambda, offset)
+    cached = None if explain else search_cache.get(cache_key)
+    if cached:
+        body, etag, payload = cached
+        if payload["query"] != q:
+            # Same normalized query, different spelling: echo the caller's own text
+            body = json.dumps({**payload, "query": q}).encode()
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        status_code = 304 if request.headers.get("if-none-match") == etag else 200
+        return cached_search_response(body, etag, status_code)
+
+    if pending_searches >= MAX_PENDING_SEARCHES:
+        raise HTTPException(status_code=503, detail="Search capacity exceeded", headers={"Retry-After": OVERLOAD_RETRY_AFTER})
+
+    trace = SearchTrace(q, limit=limit, offset=offset, genre=genre, mmr_lambda=mmr_lambda)
+    loop = asyncio.get_running_loop()
+    pending_searches += 1
     try:
-        # Encode and Search
-        query_vec = model.encode([q])
-        stored_vecs = embeddings_data['embeddings']
-        
-        scores = cosine_similarity(query_vec, stored_vecs)[0]
-        top_indices = np.argsort(scores)[::-1][:limit * 3] # Fetch 3x for dedup
-        
-        ids = np.array(embeddings_data['ids'])[top_indices]
-        scores = scores[top_indices]
-        
-        books = get_books_by_ids(ids.tolist())
-        
-        # Hydrate and Order
-        book_map = {b['id']: b for b in books}
-        ordered_books = []
-        seen = set()
-        
-        for bid, score in zip(ids, scores):
-            if len(ordered_books) >= limit: break
-            
-            book = book_map.get(bid)
-            if not book: continue
-            
-            # Simple Dedup by Title+Author
-            key = (book.get('title', '').lower(), book.get('author', '').lower())
-            if key in seen: continue
-            seen.add(key)
-            
-            ordered_books.append(book)
-            
-        return {
+        ranked_key = ranked_cache_key(q, genre)
+        ranked = ranked_cache.get(ranked_key)
+        trace.set(ranked_cached=ranked is not None)
+        if ranked is None:
+            # Hard genre filter: restrict the scan to matching rows
+            candidate_indices = None
+            if genre:
+                candidate_indices = await loop.run_in_executor(io_pool, genre_candidate_rows, genre, trace)
+
+            ranked = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+            if candidate_indices is None or len(candidate_indices) > 0:
+                # Encode and Search (every page re-ranks the same RESULTS_DEPTH candidates)
+                ranked = await loop.run_in_executor(
+                    inference_pool, rank_query, q, RESULTS_DEPTH, candidate_indices, trace
+                )
+            ranked_cache.put(ranked_key, ranked)
+
+        # MMR over all candidates, then hydrate only this page (rows aligned with ids, None if deleted)
+        ids, scores, has_more = await loop.run_in_executor(
+            inference_pool, rerank_page, *ranked, offset, limit, mmr_lambda, trace
+        )
+        books = await loop.run_in_executor(io_pool, hydrate_books, ids.tolist(), trace) if len(ids) else []
+        page_books = unique_books(books, scores)
+        trace.set(hydrated=sum(1 for b in books if b), results=len(page_books))
+
+        payload = {
             "query": q,
-            "results": ordered_books,
-            "count": len(ordered_books)
+            "results": page_books,
+            "count": len(page_books),
+            "next_offset": offset + limit if has_more else None,
+            "filters": filters
         }
+        with trace.span("serialize"):
+            if explain:
+                payload["explain"] = trace.to_dict()
+            body = json.dumps(payload).encode()
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if not explain:
+            search_cache.put(cache_key, (body, etag, payload))
+
+        response = cached_search_response(body, etag)
+        response.headers["Server-Timing"] = trace.server_timing()
+        if explain:
+            response.headers["Cache-Control"] = "no-store"
+
+        trace.finish()
+        return response
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+    finally:
+        pending_searches -= 1
 
 if __name__ == "__main__":
     import uvicorn
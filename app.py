@@ -37,11 +37,17 @@ def set_page(page_name):
 # --- IMPORTS ---
 from components.header import render_header
 from components.footer import render_footer
-from views.home import render_home
+from views.home import render_home, start_search_warmup
+from search.api_client import SEARCH_MODE
 from views.how_it_works import render_how_it_works
 from views.data_insights import render_data_insights
 from views.about import render_about
 
+# Kick off model/embedding loading in the background (no-op after the first run).
+# In 'api' mode this replica never loads the model; search goes to the API service.
+if SEARCH_MODE != "api":
+    start_search_warmup()
+
 # --- LAYOUT ---
 
 # 1. Header
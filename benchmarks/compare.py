@@ -0,0 +1,50 @@
+# benchmarks/compare.py
+import sys
+import json
+import argparse
+from typing import Any, Dict
+
+METRIC = "p50_ms"
+# Throughput-style metrics regress when they go down
+HIGHER_IS_BETTER = {"qps", "records_per_second", "throughput_rps"}
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], metric: str = METRIC, threshold: float = 0.10) -> int:
+    """
+    Prints per-benchmark change of `metric` between two result files.
+    Returns the number of benchmarks that got slower by more than `threshold`.
+    Works for search (`p50_ms`, `qps`) and pipeline (`records_per_second`, `peak_rss_mb`) results.
+    """
+    direction = -1 if metric in HIGHER_IS_BETTER else 1
+    regressions = 0
+    print(f"baseline {baseline['environment'].get('commit')}  ->  candidate {candidate['environment'].get('commit')}  ({metric})")
+    for size, benches in candidate["results"].items():
+        base_benches = baseline["results"].get(size, {})
+        for name, stats in benches.items():
+            old = base_benches.get(name)
+            if not isinstance(stats, dict) or not isinstance(old, dict) or not old.get(metric) or stats.get(metric) is None:
+                continue
+            change = (stats[metric] - old[metric]) / old[metric]
+            flag = ""
+            if direction * change > threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"{size:>10} {name:<24} {old[metric]:>10.3f} {stats[metric]:>10.3f} {change:+8.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--metric", default=METRIC)
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change for the worse that counts as a regression")
+    args = parser.parse_args()
+
+    regressions = compare(load(args.baseline), load(args.candidate), args.metric, args.threshold)
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
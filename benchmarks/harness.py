@@ -0,0 +1,97 @@
+# benchmarks/harness.py
+import os
+import gc
+import json
+import time
+import platform
+import subprocess
+import logging
+import numpy as np
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+def summarize_latencies(latencies_s: Sequence[float]) -> Dict[str, float]:
+    """
+    p50/p95/p99/mean/max in milliseconds plus single-thread QPS for a list of durations in seconds.
+    """
+    if len(latencies_s) == 0:
+        return {}
+    ms = np.asarray(latencies_s, dtype=np.float64) * 1000.0
+    total = ms.sum() / 1000.0
+    return {
+        "n": int(len(ms)),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "mean_ms": round(float(ms.mean()), 4),
+        "max_ms": round(float(ms.max()), 4),
+        "qps": round(len(ms) / total, 2) if total > 0 else None,
+    }
+
+def measure(fn: Callable[[Any], Any], inputs: Sequence[Any], warmup: int = 5) -> Dict[str, float]:
+    """
+    Times fn(x) for each input after `warmup` untimed calls.
+    GC is disabled while timing so collections don't land in random samples.
+    """
+    for x in list(inputs)[:warmup]:
+        fn(x)
+
+    latencies: List[float] = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for x in inputs:
+            start = time.perf_counter()
+            fn(x)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return summarize_latencies(latencies)
+
+def git_commit() -> Optional[str]:
+    """
+    Current commit hash of the repo, or None outside a git checkout.
+    """
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(RESULTS_DIR), capture_output=True, text=True, timeout=5
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def environment_info() -> Dict[str, Any]:
+    """
+    Machine and library details stored with every result so runs can be compared fairly.
+    """
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def save_results(name: str, results: Dict[str, Any], path: Optional[str] = None) -> str:
+    """
+    Writes {"environment": ..., "results": ...} to JSON.
+    Defaults to benchmarks/results/<name>_<commit>_<timestamp>.json.
+    """
+    env = environment_info()
+    if path is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        path = os.path.join(RESULTS_DIR, f"{name}_{env['commit'] or 'nogit'}_{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    with open(path, "w") as f:
+        json.dump({"benchmark": name, "environment": env, "results": results}, f, indent=2)
+    logger.info(f"Benchmark results written to {path}")
+    return path
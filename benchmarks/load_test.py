@@ -0,0 +1,352 @@
+# benchmarks/load_test.py
+import os
+import sys
+import json
+import time
+import socket
+import random
+import itertools
+import asyncio
+import argparse
+import logging
+import tempfile
+import subprocess
+import urllib.request
+from urllib.parse import quote, urlsplit
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import save_results, summarize_latencies
+from benchmarks.synthetic import GENRES, TITLE_WORDS, write_data_dir
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READY_TIMEOUT = 120.0
+REQUEST_TIMEOUT = 30.0
+
+# --- HTTP CLIENT ---
+# Minimal keep-alive HTTP/1.1 GET client on asyncio streams: no extra dependency,
+# and its per-request overhead is small next to the server's.
+
+class HttpConnection:
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def _connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def get(self, path: str) -> int:
+        """
+        Sends one GET and reads the full response. Returns the status code.
+        Reconnects transparently if the server closed an idle connection.
+        """
+        for attempt in range(2):
+            if self.writer is None:
+                await self._connect()
+            try:
+                self.writer.write(
+                    f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nAccept: application/json\r\n\r\n".encode()
+                )
+                await self.writer.drain()
+                return await self._read_response()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self.close()
+                if attempt:
+                    raise
+        return 0
+
+    async def _read_response(self) -> int:
+        status_line = await self.reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = await self.reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif "content-length" in headers:
+            await self.reader.readexactly(int(headers["content-length"]))
+
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status
+
+# --- WORKLOAD ---
+
+def default_queries(n: int = 500, seed: int = 0) -> List[str]:
+    """
+    Query log built from the synthetic catalog vocabulary, with repeats
+    following a skewed distribution like real traffic.
+    """
+    rng = random.Random(seed)
+    distinct = [
+        f"{rng.choice(TITLE_WORDS)} {rng.choice(TITLE_WORDS)} {rng.choice(GENRES).lower()}"
+        for _ in range(max(n // 4, 1))
+    ]
+    weights = [1.0 / (rank + 1) for rank in range(len(distinct))]
+    return rng.choices(distinct, weights=weights, k=n)
+
+def load_query_log(path: str) -> List[str]:
+    """
+    One query per line; JSONL lines with a "q" or "query" field are also accepted
+    (so slow-query logs can be replayed directly).
+    """
+    queries = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                line = record.get("q") or record.get("query") or ""
+            if line:
+                queries.append(line)
+    return queries
+
+def build_paths(queries: List[str], limit: int, recent_ratio: float, seed: int = 0) -> List[Tuple[str, str]]:
+    """
+    Replay schedule of (endpoint, path): queries go to /search in log order,
+    with /books/recent calls mixed in at `recent_ratio`.
+    """
+    rng = random.Random(seed)
+    paths = []
+    for q in queries:
+        if rng.random() < recent_ratio:
+            paths.append(("recent", f"/books/recent?limit={limit}"))
+        paths.append(("search", f"/search?q={quote(q)}&limit={limit}"))
+    return paths
+
+class LevelStats:
+    """
+    Collects per-endpoint latencies and outcomes for one load level.
+    """
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+
+    def record(self, endpoint: str, latency: float, outcome: str):
+        self.statuses.setdefault(endpoint, {})
+        self.statuses[endpoint][outcome] = self.statuses[endpoint].get(outcome, 0) + 1
+        if outcome == "200":
+            self.latencies.setdefault(endpoint, []).append(latency)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"duration_s": round(elapsed, 2)}
+        total_ok = total = 0
+        for endpoint, outcomes in self.statuses.items():
+            count = sum(outcomes.values())
+            ok = outcomes.get("200", 0)
+            stats = summarize_latencies(self.latencies.get(endpoint, []))
+            stats.pop("qps", None)  # single-stream QPS is meaningless under concurrency
+            stats.update({
+                "requests": count,
+                "throughput_rps": round(ok / elapsed, 2) if elapsed > 0 else None,
+                "error_rate": round(1 - ok / count, 4) if count else 0.0,
+                "outcomes": outcomes,
+            })
+            result[endpoint] = stats
+            total_ok += ok
+            total += count
+        result["throughput_rps"] = round(total_ok / elapsed, 2) if elapsed > 0 else None
+        result["error_rate"] = round(1 - total_ok / total, 4) if total else 0.0
+        return result
+
+async def _timed_get(conn: HttpConnection, endpoint: str, path: str, stats: LevelStats, started: float):
+    try:
+        status = await asyncio.wait_for(conn.get(path), REQUEST_TIMEOUT)
+        outcome = str(status)
+    except asyncio.TimeoutError:
+        conn.close()
+        outcome = "timeout"
+    except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+        conn.close()
+        outcome = type(e).__name__
+    stats.record(endpoint, time.perf_counter() - started, outcome)
+
+async def run_closed_loop(host: str, port: int, paths: List[Tuple[str, str]], users: int, duration: float) -> Dict[str, Any]:
+    """
+    `users` virtual users, each with its own keep-alive connection,
+    sending the next request as soon as the previous one completes.
+    """
+    stats = LevelStats()
+    deadline = time.perf_counter() + duration
+    cursor = itertools.count()
+
+    async def user():
+        conn = HttpConnection(host, port)
+        try:
+            while time.perf_counter() < deadline:
+                endpoint, path = paths[next(cursor) % len(paths)]
+                await _timed_get(conn, endpoint, path, stats, time.perf_counter())
+        finally:
+            conn.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(users)))
+    return {"mode": "closed", "concurrency": users, **stats.summary(time.perf_counter() - start)}
+
+async def run_open_loop(
+    host: str, port: int, paths: List[Tuple[str, str]], rate: float, duration: float, max_connections: int, seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Poisson arrivals at `rate` req/s regardless of how fast the server answers.
+    Latency is measured from the scheduled arrival time, so queueing inside the
+    client (when all connections are busy) counts against the server.
+    """
+    stats = LevelStats()
+    rng = random.Random(seed)
+    idle: List[HttpConnection] = []
+    slots = asyncio.Semaphore(max_connections)
+    tasks = []
+
+    async def fire(endpoint: str, path: str, scheduled: float):
+        async with slots:
+            conn = idle.pop() if idle else HttpConnection(host, port)
+            await _timed_get(conn, endpoint, path, stats, scheduled)
+            idle.append(conn)
+
+    start = time.perf_counter()
+    next_arrival = start
+    i = 0
+    while next_arrival < start + duration:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        endpoint, path = paths[i % len(paths)]
+        tasks.append(asyncio.ensure_future(fire(endpoint, path, next_arrival)))
+        i += 1
+        next_arrival += rng.expovariate(rate)
+
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    for conn in idle:
+        conn.close()
+    return {"mode": "open", "offered_rps": rate, "sent": i, **stats.summary(elapsed)}
+
+# --- SERVER ---
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_until_ready(base_url: str, timeout: float = READY_TIMEOUT):
+    """
+    Polls /ready until the API reports its ML resources loaded.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/ready", timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"API at {base_url} not ready after {timeout:.0f}s")
+
+def launch_api(data_dir: str, port: int, workers: int, encoder: str, no_cache: bool) -> subprocess.Popen:
+    """
+    Starts uvicorn serving api:app against `data_dir`.
+    """
+    env = {**os.environ, "BOOKFINDER_DATA_DIR": data_dir, "ENCODER_BACKEND": encoder}
+    if no_cache:
+        env["SEARCH_CACHE_SIZE"] = "0"
+    cmd = [
+        sys.executable, "-m", "uvicorn", "api:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ]
+    logger.info(f"Launching API: {' '.join(cmd)} (ENCODER_BACKEND={encoder}, data={data_dir})")
+    return subprocess.Popen(cmd, cwd=REPO_DIR, env=env)
+
+def run_levels(base_url: str, paths: List[Tuple[str, str]], args) -> List[Dict[str, Any]]:
+    parts = urlsplit(base_url)
+    host, port = parts.hostname, parts.port or 80
+    levels = args.concurrency if args.mode == "closed" else args.rates
+
+    results = []
+    for level in levels:
+        if args.mode == "closed":
+            result = asyncio.run(run_closed_loop(host, port, paths, level, args.duration))
+        else:
+            result = asyncio.run(run_open_loop(host, port, paths, level, args.duration, args.max_connections, args.seed))
+
+        search = result.get("search", {})
+        logger.info(
+            f"{args.mode} level={level}: {result['throughput_rps']} rps, errors={result['error_rate']:.2%}, "
+            f"search p50={search.get('p50_ms')}ms p95={search.get('p95_ms')}ms p99={search.get('p99_ms')}ms"
+        )
+        results.append(result)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Book Finder API")
+    parser.add_argument("--url", default=None, help="Target an already running API instead of launching one")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed",
+                        help="closed: fixed number of users; open: fixed arrival rate")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64], help="Closed-loop user counts")
+    parser.add_argument("--rates", type=float, nargs="+", default=[25, 50, 100, 200], help="Open-loop arrival rates (req/s)")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per level")
+    parser.add_argument("--max-connections", type=int, default=256, help="Open-loop connection cap")
+    parser.add_argument("--query-log", default=None, help="Queries to replay (text or JSONL); synthetic if omitted")
+    parser.add_argument("--recent-ratio", type=float, default=0.1, help="Share of /books/recent requests")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    # Launched-server options
+    parser.add_argument("--catalog-size", type=int, default=20000, help="Synthetic catalog size for the launched API")
+    parser.add_argument("--data-dir", default=None, help="Serve this data dir instead of a synthetic one")
+    parser.add_argument("--encoder", choices=["stub", "torch", "onnx"], default="stub",
+                        help="Encoder for the launched API (stub = model-free hashing encoder)")
+    parser.add_argument("--server-workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the /search response cache")
+    parser.add_argument("--output", default=None, help="Result JSON path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    queries = load_query_log(args.query_log) if args.query_log else default_queries(seed=args.seed)
+    paths = build_paths(queries, args.limit, args.recent_ratio, args.seed)
+
+    config = dict(vars(args))
+    if args.url:
+        results = run_levels(args.url.rstrip("/"), paths, args)
+    else:
+        with tempfile.TemporaryDirectory(prefix="bookfinder_load_") as tmp:
+            data_dir = args.data_dir or write_data_dir(os.path.join(tmp, "data"), args.catalog_size, seed=args.seed)
+            port = _free_port()
+            server = launch_api(data_dir, port, args.server_workers, args.encoder, args.no_cache)
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                wait_until_ready(base_url)
+                results = run_levels(base_url, paths, args)
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+    path = save_results("load", {"config": config, "levels": results}, args.output)
+    print(f"Results saved to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+# benchmarks/pipeline_bench.py
+import os
+import sys
+import csv
+import json
+import shutil
+import argparse
+import logging
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import save_results
+from benchmarks.synthetic import generate_books
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCALES = [10000, 100000]
+# Share of each scale served by the OpenLibrary stub (the rest comes from the CSV)
+API_SHARE = 0.2
+# Share of CSV rows repeated verbatim so the transformation dedup has work to do
+DUPLICATE_SHARE = 0.05
+
+CSV_COLUMNS = ["Title", "Author", "Description", "Genre", "ISBN", "Publish_Year", "Cover_Image"]
+
+# --- FIXTURES ---
+
+def write_csv_fixture(path: str, n: int, seed: int = 0) -> int:
+    """
+    Writes `n` synthetic rows in the CSV loader's column layout.
+    Descriptions carry HTML markup/entities so clean_text does real work.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rows = 0
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        duplicate_every = int(1 / DUPLICATE_SHARE) if DUPLICATE_SHARE else 0
+        for book in generate_books(n, seed=seed):
+            row = [
+                book["title"], book["author"],
+                f"<p>{book['description']}</p>  &amp; more\n", book["genre"],
+                book["isbn"], book["publish_year"], "",
+            ]
+            writer.writerow(row)
+            rows += 1
+            if duplicate_every and rows % duplicate_every == 0 and rows < n:
+                writer.writerow(row)
+                rows += 1
+            if rows >= n:
+                break
+    return rows
+
+def build_openlibrary_fixture(subjects: List[str], per_subject: int, seed: int = 0) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    OpenLibrary search.json 'docs' per subject, shaped like the real API
+    (list-valued author/isbn/year/subject fields, first_sentence as a list).
+    """
+    fixture = {}
+    books = generate_books(per_subject * len(subjects), seed=seed + 1, start_id=10_000_000)
+    for subject in subjects:
+        docs = []
+        for _ in range(per_subject):
+            book = next(books)
+            docs.append({
+                "key": f"/works/OL{book['id']}W",
+                "title": book["title"],
+                "first_sentence": [book["description"]],
+                "subject": [subject.replace("_", " ").title()] + book["genre"].split(", "),
+                "cover_i": book["id"],
+                "author_name": [book["author"]],
+                "isbn": [book["isbn"]],
+                "publish_year": [int(book["publish_year"])],
+            })
+        fixture[subject] = docs
+    return fixture
+
+class _StubHandler(BaseHTTPRequestHandler):
+    fixture: Dict[str, List[Dict[str, Any]]] = {}
+
+    def do_GET(self):
+        params = parse_qs(urlsplit(self.path).query)
+        subject = params.get("subject", [""])[0]
+        limit = int(params.get("limit", ["100"])[0])
+        offset = int(params.get("offset", ["0"])[0])
+        docs = self.fixture.get(subject, [])[offset:offset + limit]
+        body = json.dumps({"numFound": len(docs), "docs": docs}).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class StubOpenLibraryServer:
+    """
+    Local stand-in for openlibrary.org/search.json, serving a fixture per subject.
+    """
+
+    def __init__(self, fixture: Dict[str, List[Dict[str, Any]]]):
+        handler = type("FixtureHandler", (_StubHandler,), {"fixture": fixture})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/search.json"
+        self._thread = threading.Thread(target=self.server.serve_forever, name="openlibrary-stub", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+# --- STAGES ---
+
+def _reset_data_dir(data_dir: str):
+    """
+    Removes the DB, temp files and embeddings from a previous run, keeping raw fixtures.
+    """
+    for name in os.listdir(data_dir):
+        if name == "raw":
+            continue
+        path = os.path.join(data_dir, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+def bench_scale(scale: int, data_dir: str, stub_url: str, seed: int, embed: bool) -> Dict[str, Any]:
+    """
+    Runs each stage in isolation, then the pipeline end-to-end, under PipelineRunReport.
+    Imports happen here because module-level paths depend on the env set in main().
+    """
+    import run_pipeline
+    from ingestion.config import DEFAULT_CSV_PATH, SUBJECTS_TO_FETCH
+    from ingestion.csv_loader import load_csv
+    from ingestion import openlibrary_loader
+    from transformation.cleaner import clean_book_record
+    from storage.db import init_db, insert_books
+    from monitoring.profiling import PipelineRunReport
+
+    openlibrary_loader.OPENLIBRARY_SEARCH_URL = stub_url
+    per_subject = max(1, int(scale * API_SHARE) // len(SUBJECTS_TO_FETCH))
+    csv_rows = write_csv_fixture(DEFAULT_CSV_PATH, scale - per_subject * len(SUBJECTS_TO_FETCH), seed=seed)
+    _reset_data_dir(data_dir)
+
+    isolated = PipelineRunReport(report_dir=os.path.join(data_dir, "reports"))
+
+    def stage_load_csv():
+        books = load_csv(DEFAULT_CSV_PATH)
+        return {"records_in": csv_rows, "records_out": len(books), "books": books}
+
+    def stage_fetch_openlibrary():
+        books = openlibrary_loader.load_all_openlibrary_data(SUBJECTS_TO_FETCH, limit=per_subject)
+        return {"records_in": None, "records_out": len(books), "books": books}
+
+    raw = isolated.run("load_csv", stage_load_csv)["books"]
+    raw += isolated.run("fetch_openlibrary", stage_fetch_openlibrary)["books"]
+
+    def stage_clean():
+        cleaned = [clean_book_record(b) for b in raw]
+        return {"records_in": len(raw), "records_out": len(cleaned), "books": cleaned}
+
+    cleaned = isolated.run("clean", stage_clean)["books"]
+
+    def stage_insert():
+        init_db()
+        inserted = insert_books(cleaned)
+        if inserted is None:
+            raise RuntimeError("Books could not be stored")
+        return {"records_in": len(cleaned), "records_out": inserted}
+
+    isolated.run("insert_books", stage_insert)
+
+    # End-to-end through the real stage functions (JSON hand-off files included)
+    _reset_data_dir(data_dir)
+    end_to_end = PipelineRunReport(report_dir=os.path.join(data_dir, "reports"))
+    end_to_end.run("e2e_ingestion", run_pipeline.run_ingestion, limit=per_subject)
+    end_to_end.run("e2e_transformation", run_pipeline.run_transformation)
+    end_to_end.run("e2e_storage", run_pipeline.run_storage)
+    if embed:
+        end_to_end.run("e2e_embedding", run_pipeline.run_embedding)
+
+    # The same run as one overlapped DAG (always includes embedding)
+    streaming = PipelineRunReport(report_dir=os.path.join(data_dir, "reports"))
+    if embed:
+        _reset_data_dir(data_dir)
+        streaming.run("e2e_streaming", run_pipeline.run_streaming, limit=per_subject)
+
+    stages = {s["stage"]: s for s in isolated.stages + end_to_end.stages + streaming.stages}
+    e2e = end_to_end.stages
+    stages["e2e_total"] = {
+        "stage": "e2e_total",
+        "wall_seconds": round(sum(s["wall_seconds"] for s in e2e), 4),
+        "records_in": scale,
+        "records_per_second": round(scale / sum(s["wall_seconds"] for s in e2e), 2),
+        "peak_rss_mb": max((s["peak_rss_mb"] or 0) for s in e2e),
+    }
+    for name, stage in stages.items():
+        logger.info(f"  {name:<20} {stage['wall_seconds']:>8.2f}s {stage['records_per_second']} rec/s peak_rss={stage['peak_rss_mb']}MB")
+    return stages
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline throughput benchmark on synthetic fixtures")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="Total records per run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--embed", action="store_true", help="Include the embedding stage (stub encoder) and the streaming run")
+    parser.add_argument("--output", default=None, help="Result JSON path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bookfinder_pipeline_") as data_dir:
+        # Must be set before any pipeline module is imported
+        os.environ["BOOKFINDER_DATA_DIR"] = data_dir
+        os.environ["OPENLIBRARY_REQUEST_DELAY"] = "0"
+        os.environ.setdefault("ENCODER_BACKEND", "stub")
+        from ingestion.config import SUBJECTS_TO_FETCH
+
+        results = {}
+        for scale in args.scales:
+            logger.info(f"Benchmarking pipeline at {scale} records...")
+            per_subject = max(1, int(scale * API_SHARE) // len(SUBJECTS_TO_FETCH))
+            with StubOpenLibraryServer(build_openlibrary_fixture(SUBJECTS_TO_FETCH, per_subject, args.seed)) as stub:
+                results[str(scale)] = bench_scale(scale, data_dir, stub.url, args.seed, args.embed)
+
+    path = save_results("pipeline", results, args.output)
+    print(f"Results saved to {path}")
+
+if __name__ == "__main__":
+    main()
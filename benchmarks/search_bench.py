@@ -0,0 +1,144 @@
+# benchmarks/search_bench.py
+import os
+import sys
+import argparse
+import logging
+import tempfile
+import numpy as np
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage.db as db
+from benchmarks.harness import measure, save_results
+from benchmarks.synthetic import GENRES, build_catalog_db, build_embeddings_payload
+from search.binary_index import pack_sign_bits
+from search.ranking import mmr_order, unique_books, RESULTS_DEPTH
+from search.vector_index import (
+    STORAGE_TYPES, STORAGE_FLOAT32, _scan_scores, quantize_embeddings, search_vectors, top_k_indices
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [10000, 100000]
+TOP_K = RESULTS_DEPTH   # what /search asks the index for (one ranking per query, paged)
+PAGE_LIMIT = 10         # results per /search page (the default limit)
+
+def _recall(exact: List[np.ndarray], found: List[np.ndarray]) -> float:
+    hits = sum(len(set(e.tolist()) & set(f.tolist())) for e, f in zip(exact, found))
+    total = sum(len(e) for e in exact)
+    return round(hits / total, 4) if total else 0.0
+
+def bench_index(embeddings: np.ndarray, queries: np.ndarray, top_k: int) -> Dict[str, Any]:
+    """
+    Scoring, top-k selection and full search_vectors for every storage mode,
+    with and without the binary pre-filter. Recall is measured against exact float32.
+    """
+    results: Dict[str, Any] = {}
+    exact_data = {"storage": STORAGE_FLOAT32, "embeddings": embeddings}
+    exact = [search_vectors(exact_data, q, top_k, use_binary=False)[0] for q in queries]
+
+    scores = _scan_scores(exact_data, queries[0])
+    results["topk_argpartition"] = measure(lambda q: top_k_indices(scores, top_k), queries)
+    results["topk_argsort"] = measure(lambda q: np.argsort(-scores)[:top_k], queries)
+
+    codes = pack_sign_bits(embeddings)
+    for storage in STORAGE_TYPES:
+        data = quantize_embeddings(embeddings, storage)
+        data["full_embeddings"] = embeddings
+        data["binary_codes"] = codes
+
+        results[f"score_{storage}"] = measure(lambda q: _scan_scores(data, q), queries)
+        for binary in (False, True):
+            label = f"search_{storage}" + ("_binary" if binary else "")
+            stats = measure(lambda q: search_vectors(data, q, top_k, use_binary=binary), queries)
+            found = [search_vectors(data, q, top_k, use_binary=binary)[0] for q in queries]
+            stats[f"recall@{top_k}"] = _recall(exact, found)
+            stats["resident_mb"] = round((data["embeddings"].nbytes + (codes.nbytes if binary else 0)) / 1e6, 2)
+            results[label] = stats
+    return results
+
+def bench_catalog(n: int, embeddings: np.ndarray, queries: np.ndarray, top_k: int, seed: int, workdir: str) -> Dict[str, Any]:
+    """
+    DB-backed stages of /search: genre pre-filter, MMR re-ranking of the top_k candidates
+    into the first page, and cold/warm hydration of that page plus repeat removal.
+    """
+    results: Dict[str, Any] = {}
+    db.DB_PATH = build_catalog_db(os.path.join(workdir, f"catalog_{n}.db"), n, seed=seed)
+    db.book_cache.clear()
+
+    id_array = np.arange(1, n + 1)
+    data = {"storage": STORAGE_FLOAT32, "embeddings": embeddings}
+    searched = [search_vectors(data, q, top_k, use_binary=False) for q in queries]
+    candidates = [(embeddings[rows], scores) for rows, scores in searched]
+    # What /search hydrates: the first page of the MMR order
+    pages = [rows[mmr_order(vectors, scores, PAGE_LIMIT)] for (rows, scores), (vectors, _) in zip(searched, candidates)]
+    ranked = [id_array[rows].tolist() for rows in pages]
+
+    genre_sets = [[GENRES[i % len(GENRES)]] for i in range(len(queries))]
+    def genre_filter(genres):
+        allowed = db.get_book_ids_by_genres(genres)
+        return np.flatnonzero(np.isin(id_array, allowed))
+    results["genre_filter"] = measure(genre_filter, genre_sets, warmup=1)
+
+    def hydrate_cold(ids):
+        db.book_cache.clear()
+        return db.get_books_by_ids(ids, aligned=True)
+    results["hydrate_cold"] = measure(hydrate_cold, ranked)
+
+    # Fill the LRU with every query's page, then time the all-hit path
+    hydrated = [db.get_books_by_ids(ids, aligned=True) for ids in ranked]
+    results["hydrate_warm"] = measure(lambda ids: db.get_books_by_ids(ids, aligned=True), ranked)
+
+    def rerank(case):
+        (vectors, scores), books = case
+        order = mmr_order(vectors, scores, PAGE_LIMIT)
+        return unique_books(books, scores[order])
+    results["mmr"] = measure(rerank, list(zip(candidates, hydrated)))
+    return results
+
+def run(sizes: List[int], num_queries: int, top_k: int, seed: int, with_db: bool, embedding_mode: str) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="bookfinder_bench_") as workdir:
+        for n in sizes:
+            logger.info(f"Benchmarking catalog of {n} books...")
+            embeddings = build_embeddings_payload(n, mode=embedding_mode, seed=seed)["embeddings"]
+
+            # Queries are perturbed catalog vectors so they have realistic neighbours
+            rng = np.random.default_rng(seed + 1)
+            picks = rng.choice(n, size=min(num_queries, n), replace=False)
+            queries = embeddings[picks] + 0.05 * rng.standard_normal((len(picks), embeddings.shape[1])).astype(np.float32)
+            queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+            size_results = {"catalog_size": n, "top_k": top_k, "queries": len(queries)}
+            size_results.update(bench_index(embeddings, queries, top_k))
+            if with_db:
+                size_results.update(bench_catalog(n, embeddings, queries, top_k, seed, workdir))
+            results[str(n)] = size_results
+
+            for name, stats in size_results.items():
+                if isinstance(stats, dict):
+                    extra = f" recall={stats[f'recall@{top_k}']}" if f"recall@{top_k}" in stats else ""
+                    logger.info(f"  {name:<24} p50={stats['p50_ms']:.3f}ms p99={stats['p99_ms']:.3f}ms qps={stats['qps']}{extra}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Search latency/throughput benchmark on a synthetic catalog")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Catalog sizes to benchmark")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per size")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--embeddings", choices=["random", "hashed"], default="random",
+                        help="Clustered random vectors or HashingEncoder vectors of the synthetic text")
+    parser.add_argument("--no-db", action="store_true", help="Skip SQLite-backed stages (filter, hydration, dedup)")
+    parser.add_argument("--output", default=None, help="Result JSON path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.queries, args.top_k, args.seed, not args.no_db, args.embeddings)
+    path = save_results("search", results, args.output)
+    print(f"Results saved to {path}")
+
+if __name__ == "__main__":
+    main()
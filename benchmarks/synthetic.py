@@ -0,0 +1,162 @@
+# benchmarks/synthetic.py
+import os
+import pickle
+import sqlite3
+import logging
+import numpy as np
+from typing import Any, Dict, Iterator, List, Tuple
+from transformation.stub_encoder import HashingEncoder, STUB_DIMS
+
+# NOTE: modules that bind data paths at import (ingestion.config, the embedder) are
+# imported inside functions so callers can set BOOKFINDER_DATA_DIR first.
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "storage", "schema.sql")
+
+GENRES = [
+    "Mystery", "Science Fiction", "Romance", "Fantasy", "Thriller", "Historical Fiction",
+    "Horror", "Biography", "Programming", "History", "Poetry", "Young Adult",
+    "Crime", "Adventure", "Philosophy", "Memoir", "Travel", "Cooking",
+]
+TITLE_WORDS = [
+    "shadow", "river", "empire", "silent", "garden", "machine", "winter", "letters", "stars", "code",
+    "midnight", "kingdom", "ocean", "forgotten", "glass", "storm", "city", "secret", "last", "journey",
+    "memory", "fire", "house", "crown", "signal", "island", "dream", "iron", "harbor", "voices",
+]
+FIRST_NAMES = ["ada", "james", "maria", "chen", "olu", "sofia", "raj", "elena", "tom", "yuki", "amir", "lena"]
+LAST_NAMES = ["hughes", "okafor", "lindqvist", "park", "moreau", "santos", "kowalski", "nair", "reed", "tanaka"]
+SOURCES = ["csv", "openlibrary"]
+
+# Books are generated and written in batches of this size
+BATCH_SIZE = 50000
+
+def generate_books(n: int, seed: int = 0, start_id: int = 1) -> Iterator[Dict[str, Any]]:
+    """
+    Yields `n` deterministic fake book records shaped like rows of the books table.
+    """
+    rng = np.random.default_rng(seed)
+    for offset in range(0, n, BATCH_SIZE):
+        size = min(BATCH_SIZE, n - offset)
+        words = rng.integers(0, len(TITLE_WORDS), size=(size, 3))
+        firsts = rng.integers(0, len(FIRST_NAMES), size=size)
+        lasts = rng.integers(0, len(LAST_NAMES), size=size)
+        genres = rng.integers(0, len(GENRES), size=(size, 2))
+        years = rng.integers(1900, 2025, size=size)
+        sources = rng.integers(0, len(SOURCES), size=size)
+
+        for i in range(size):
+            book_id = start_id + offset + i
+            title = " ".join(TITLE_WORDS[w] for w in words[i]) + f" {book_id}"
+            genre = ", ".join(dict.fromkeys(GENRES[g] for g in genres[i]))
+            yield {
+                "id": book_id,
+                "isbn": f"978{book_id:010d}",
+                "title": title,
+                "description": f"A {genre.lower()} story about the {TITLE_WORDS[words[i][0]]} and the {TITLE_WORDS[words[i][2]]}.",
+                "author": f"{FIRST_NAMES[firsts[i]]} {LAST_NAMES[lasts[i]]}",
+                "genre": genre,
+                "cover_image": None,
+                "publish_year": str(years[i]),
+                "source": SOURCES[sources[i]],
+            }
+
+def generate_embeddings(n: int, dims: int = STUB_DIMS, seed: int = 0, clusters: int = 256, noise: float = 0.05) -> np.ndarray:
+    """
+    Clustered random unit vectors: `clusters` centroids plus gaussian noise.
+    Clustering mimics real embedding structure so quantization / binary recall is realistic.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((clusters, dims)).astype(np.float32)
+    centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+
+    embeddings = np.empty((n, dims), dtype=np.float32)
+    for start in range(0, n, BATCH_SIZE):
+        end = min(start + BATCH_SIZE, n)
+        assignment = rng.integers(0, clusters, size=end - start)
+        block = centroids[assignment] + noise * rng.standard_normal((end - start, dims)).astype(np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        embeddings[start:end] = block
+    return embeddings
+
+def hashed_embeddings(books: List[Dict[str, Any]], encoder: HashingEncoder = None) -> np.ndarray:
+    """
+    Deterministic-fake embeddings of the books' embedding text (no model download).
+    Queries encoded with the same HashingEncoder retrieve books sharing their words.
+    """
+    from transformation.embedder import generate_text_for_embedding
+    encoder = encoder or HashingEncoder()
+    texts = [generate_text_for_embedding(b) for b in books]
+    return encoder.encode(texts, normalize_embeddings=True)
+
+def build_catalog_db(db_path: str, n: int, seed: int = 0) -> str:
+    """
+    Creates a SQLite catalog with the production schema and `n` synthetic books.
+    Existing files at db_path are replaced.
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        with open(SCHEMA_PATH) as f:
+            conn.executescript(f.read())
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+
+        query = """
+        INSERT INTO books (id, isbn, title, description, author, genre, cover_image, publish_year, source, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('2020-01-01', '+' || ? || ' seconds'))
+        """
+        batch: List[Tuple] = []
+        for book in generate_books(n, seed=seed):
+            batch.append((
+                book["id"], book["isbn"], book["title"], book["description"], book["author"],
+                book["genre"], book["cover_image"], book["publish_year"], book["source"], book["id"],
+            ))
+            if len(batch) >= BATCH_SIZE:
+                conn.executemany(query, batch)
+                batch = []
+        if batch:
+            conn.executemany(query, batch)
+        conn.commit()
+    finally:
+        conn.close()
+
+    logger.info(f"Synthetic catalog with {n} books written to {db_path}")
+    return db_path
+
+def build_embeddings_payload(n: int, mode: str = "random", seed: int = 0, dims: int = STUB_DIMS) -> Dict[str, Any]:
+    """
+    Embeddings payload in the same shape as transformation.embedder.load_embeddings().
+    - mode='random': clustered random vectors (fast, any size)
+    - mode='hashed': HashingEncoder vectors of the synthetic book text
+    """
+    if mode == "hashed":
+        embeddings = hashed_embeddings(list(generate_books(n, seed=seed)))
+    else:
+        embeddings = generate_embeddings(n, dims=dims, seed=seed)
+    return {"ids": list(range(1, n + 1)), "embeddings": embeddings}
+
+def write_data_dir(data_dir: str, n: int, seed: int = 0) -> str:
+    """
+    Lays out a complete data directory (catalog DB + float32 embeddings pickle)
+    that the API can serve with BOOKFINDER_DATA_DIR=data_dir and ENCODER_BACKEND=stub.
+    Embeddings come from the HashingEncoder so stub-encoded queries find matching books.
+    """
+    from ingestion.config import DB_PATH
+    from search.binary_index import pack_sign_bits
+    from transformation.embedder import EMBEDDINGS_FILE
+
+    os.makedirs(data_dir, exist_ok=True)
+    build_catalog_db(os.path.join(data_dir, os.path.basename(DB_PATH)), n, seed=seed)
+
+    payload = build_embeddings_payload(n, mode="hashed", seed=seed)
+    payload["binary_codes"] = pack_sign_bits(payload["embeddings"])
+    with open(os.path.join(data_dir, os.path.basename(EMBEDDINGS_FILE)), "wb") as f:
+        pickle.dump(payload, f)
+
+    logger.info(f"Synthetic data directory ready at {data_dir}")
+    return data_dir
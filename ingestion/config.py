@@ -4,9 +4,13 @@ import os
 # Base directory
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-# Data paths
-DATA_DIR = os.path.join(BASE_DIR, "data")
+# Data paths (BOOKFINDER_DATA_DIR points a process at another catalog, e.g. for load tests)
+DATA_DIR = os.environ.get("BOOKFINDER_DATA_DIR", os.path.join(BASE_DIR, "data"))
 DB_PATH = os.path.join(DATA_DIR, "books.db")
+# Version stamps written by run_pipeline.py; readers use them to invalidate caches
+CATALOG_VERSION_FILE = os.path.join(DATA_DIR, "catalog_version.json")
+# Progress markers that let an interrupted pipeline run resume mid-stage
+CHECKPOINT_DIR = os.path.join(DATA_DIR, "checkpoints")
 
 # Input paths
 # Place your CSV files in a 'data/raw' folder or update this path
@@ -14,5 +18,7 @@ RAW_DATA_DIR = os.path.join(DATA_DIR, "raw")
 DEFAULT_CSV_PATH = os.path.join(RAW_DATA_DIR, "books_input.csv")
 
 # OpenLibrary API Settings
-OPENLIBRARY_SEARCH_URL = "https://openlibrary.org/search.json"
+OPENLIBRARY_SEARCH_URL = os.environ.get("OPENLIBRARY_SEARCH_URL", "https://openlibrary.org/search.json")
+# Pause between subject requests (politeness); benchmarks against a local stub set it to 0
+OPENLIBRARY_REQUEST_DELAY = float(os.environ.get("OPENLIBRARY_REQUEST_DELAY", "1"))
 SUBJECTS_TO_FETCH = ["science_fiction", "love", "mystery", "programming"]
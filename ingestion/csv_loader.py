@@ -1,4 +1,5 @@
 # ingestion/csv_loader.py
+import io
 import pandas as pd
 import logging
 from typing import List, Dict, Any, Optional
@@ -55,18 +56,26 @@ def normalize_csv_record(row: Dict[str, Any]) -> Dict[str, Optional[str]]:
         "source": "csv"
     }
 
-def load_csv(file_path: str) -> List[Dict[str, Optional[str]]]:
+def load_csv(file_path: str, start_offset: int = 0) -> List[Dict[str, Optional[str]]]:
     """
     Loads books from a CSV file.
     Returns a list of authorized book dictionaries.
+    - start_offset: byte offset of the first unread row (appended data); the header is still applied
     """
     if not file_path.endswith('.csv'):
         logger.error(f"File {file_path} is not a CSV file.")
         return []
 
     try:
-        df = pd.read_csv(file_path)
-        logger.info(f"Successfully loaded CSV from {file_path} with {len(df)} rows.")
+        if start_offset:
+            with open(file_path, 'rb') as f:
+                header = f.readline()
+                f.seek(start_offset)
+                tail = f.read()
+            df = pd.read_csv(io.BytesIO(header + tail)) if tail.strip() else pd.DataFrame()
+        else:
+            df = pd.read_csv(file_path)
+        logger.info(f"Successfully loaded CSV from {file_path} with {len(df)} rows (from byte {start_offset}).")
         
         books = []
         for _, row in df.iterrows():
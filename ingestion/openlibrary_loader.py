@@ -2,18 +2,42 @@
 import requests
 import logging
 import time
+import threading
 from typing import List, Dict, Optional
-from ingestion.config import OPENLIBRARY_SEARCH_URL
+from ingestion.config import OPENLIBRARY_SEARCH_URL, OPENLIBRARY_REQUEST_DELAY
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-def fetch_books_from_openlibrary(subject: str, limit: int = 20) -> List[Dict[str, Optional[str]]]:
+class RequestRateLimiter:
+    """
+    Spaces request starts at least `interval` seconds apart across every thread
+    that shares it, so concurrent fetch workers don't multiply the request rate.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+# One limiter per process: be nice to the API however many workers fetch
+openlibrary_rate_limiter = RequestRateLimiter(OPENLIBRARY_REQUEST_DELAY)
+
+def fetch_books_from_openlibrary(subject: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Optional[str]]]:
     """
     Fetches books from OpenLibrary API by subject.
     Normalizes them to the standard format.
+    - offset: skip results already ingested (incremental runs)
     """
-    logger.info(f"Fetching books for subject: {subject}...")
+    logger.info(f"Fetching books for subject: {subject} (offset={offset})...")
     
     params = {
         "subject": subject,
@@ -24,8 +48,11 @@ def fetch_books_from_openlibrary(subject: str, limit: int = 20) -> List[Dict[str
         # For simplicity in this pipeline, we will use 'first_sentence' as a proxy for description
         # or handle missing descriptions gracefully as per requirements.
     }
+    if offset:
+        params["offset"] = offset
     
     try:
+        openlibrary_rate_limiter.wait()
         response = requests.get(OPENLIBRARY_SEARCH_URL, params=params)
         response.raise_for_status()
         data = response.json()
@@ -95,8 +122,8 @@ def load_all_openlibrary_data(subjects: List[str], limit: int = 20) -> List[Dict
     """
     all_books = []
     for subject in subjects:
+        # Requests are spaced by the shared rate limiter
         books = fetch_books_from_openlibrary(subject, limit=limit)
         all_books.extend(books)
-        time.sleep(1) # Be nice to the API
     
     return all_books
@@ -0,0 +1,150 @@
+# monitoring/metrics.py
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+# Latency buckets (seconds): sub-millisecond cache hits up to multi-second cold encodes
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: List["_Metric"] = []
+
+def _format_labels(labelnames: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    """Monotonically increasing count, one series per label combination."""
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Gauge(_Metric):
+    """Point-in-time value, usually set just before a scrape."""
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Histogram(_Metric):
+    """Cumulative-bucket latency histogram in the Prometheus exposition format."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, (counts, total, count) in self._series.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    labels = _format_labels(self.labelnames, key, 'le="%s"' % le)
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+def render_metrics() -> str:
+    """
+    All registered metrics in the Prometheus text exposition format (v0.0.4).
+    """
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# --- SERVING METRICS ---
+REQUESTS = Counter("bookfinder_requests_total", "HTTP requests by route and status code.", ("endpoint", "status"))
+ERRORS = Counter("bookfinder_request_errors_total", "HTTP requests that returned 5xx.", ("endpoint",))
+REQUEST_LATENCY = Histogram("bookfinder_request_latency_seconds", "End-to-end request latency.", ("endpoint",))
+SEARCH_STAGE_LATENCY = Histogram(
+    "bookfinder_search_stage_seconds",
+    "Search latency per stage (filter, encode, scan, entity, hydrate, rerank, serialize).",
+    ("stage",),
+)
+CACHE_HITS = Gauge("bookfinder_cache_hits", "Cache hits since startup.", ("cache",))
+CACHE_MISSES = Gauge("bookfinder_cache_misses", "Cache misses since startup.", ("cache",))
+CACHE_HIT_RATIO = Gauge("bookfinder_cache_hit_ratio", "Cache hit ratio since startup.", ("cache",))
+CACHE_SIZE = Gauge("bookfinder_cache_entries", "Entries currently cached.", ("cache",))
+INDEX_SIZE = Gauge("bookfinder_index_size", "Books in the loaded embedding index.")
+MODEL_LOAD_SECONDS = Gauge("bookfinder_model_load_seconds", "Time taken to load the encoder and embeddings.")
+PENDING_SEARCHES = Gauge("bookfinder_pending_searches", "Searches currently in flight.")
+
+def record_cache_stats(name: str, stats: Dict[str, float]):
+    """
+    Copies an LRUCache.stats() snapshot into the cache gauges.
+    """
+    CACHE_HITS.set(stats["hits"], cache=name)
+    CACHE_MISSES.set(stats["misses"], cache=name)
+    CACHE_HIT_RATIO.set(stats["hit_ratio"], cache=name)
+    CACHE_SIZE.set(stats["size"], cache=name)
@@ -0,0 +1,173 @@
+# monitoring/profiling.py
+import os
+import sys
+import json
+import time
+import cProfile
+import threading
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from ingestion.config import DATA_DIR
+
+try:
+    import resource  # POSIX only
+except ImportError:
+    resource = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+REPORT_DIR = os.path.join(DATA_DIR, "reports")
+# How often the RSS sampler polls memory while a stage runs
+RSS_SAMPLE_INTERVAL = 0.05
+
+def _current_rss_bytes() -> Optional[int]:
+    """
+    Resident set size of this process (Linux /proc); None where unavailable.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _max_rss_bytes() -> Optional[int]:
+    """
+    Lifetime peak RSS from getrusage (kilobytes on Linux, bytes on macOS); None off POSIX.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def _child_cpu_seconds() -> Optional[float]:
+    """
+    CPU time of finished children (e.g. the multi-process encode pool); None off POSIX.
+    """
+    if resource is None:
+        return None
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return children.ru_utime + children.ru_stime
+
+class _PeakRSSSampler:
+    """
+    Background thread tracking the highest RSS seen while a stage runs.
+    """
+
+    def __init__(self):
+        self.peak = _current_rss_bytes() or 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(RSS_SAMPLE_INTERVAL):
+            rss = _current_rss_bytes()
+            if rss is None:
+                return
+            self.peak = max(self.peak, rss)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        rss = _current_rss_bytes()
+        if rss:
+            self.peak = max(self.peak, rss)
+
+class PipelineRunReport:
+    """
+    Collects per-stage wall time, CPU time, record counts, throughput and peak RSS
+    for one pipeline run, and writes them as a JSON report.
+    - profile=True also dumps a cProfile .prof file per stage
+    """
+
+    def __init__(self, profile: bool = False, report_dir: str = REPORT_DIR):
+        self.run_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.started_at = datetime.now().isoformat()
+        self.profile = profile
+        self.report_dir = report_dir
+        self.stages: List[Dict[str, Any]] = []
+
+    def run(self, name: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        Runs a stage function under instrumentation.
+        The stage may return a dict with 'records_in' / 'records_out' counts.
+        """
+        profiler = cProfile.Profile() if self.profile else None
+        cpu_start = time.process_time()
+        child_cpu_start = _child_cpu_seconds()
+        wall_start = time.perf_counter()
+        status = "ok"
+        result = None
+
+        with _PeakRSSSampler() as sampler:
+            if profiler:
+                profiler.enable()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                status = "failed"
+                raise
+            finally:
+                if profiler:
+                    profiler.disable()
+                wall = time.perf_counter() - wall_start
+                child_cpu = _child_cpu_seconds()
+                child_cpu = child_cpu - child_cpu_start if child_cpu is not None else None
+                self._record(name, status, wall, time.process_time() - cpu_start, child_cpu, sampler, result, profiler)
+
+        return result
+
+    def _record(self, name, status, wall, cpu, child_cpu, sampler, result, profiler):
+        counts = result if isinstance(result, dict) else {}
+        records_in = counts.get("records_in")
+        records_out = counts.get("records_out")
+        processed = records_in if records_in is not None else records_out
+
+        stage = {
+            "stage": name,
+            "status": status,
+            "wall_seconds": round(wall, 4),
+            # Includes finished child processes where getrusage is available
+            "cpu_seconds": round(cpu + (child_cpu or 0.0), 4),
+            "child_cpu_seconds": round(child_cpu, 4) if child_cpu is not None else None,
+            "records_in": records_in,
+            "records_out": records_out,
+            "records_per_second": round(processed / wall, 2) if processed and wall > 0 else None,
+            "peak_rss_mb": round(sampler.peak / 1e6, 1) if sampler.peak else None,
+        }
+        if counts.get("details"):
+            # e.g. per-stage queue statistics of a streaming run
+            stage["details"] = counts["details"]
+
+        if profiler:
+            profile_dir = os.path.join(self.report_dir, self.run_id)
+            os.makedirs(profile_dir, exist_ok=True)
+            stage["profile"] = os.path.join(profile_dir, f"{name}.prof")
+            profiler.dump_stats(stage["profile"])
+
+        self.stages.append(stage)
+        logger.info(f"Stage '{name}' {status}: {json.dumps(stage)}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        peak = _max_rss_bytes()
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "finished_at": datetime.now().isoformat(),
+            "total_wall_seconds": round(sum(s["wall_seconds"] for s in self.stages), 4),
+            "process_peak_rss_mb": round(peak / 1e6, 1) if peak else None,
+            "stages": self.stages,
+        }
+
+    def save(self, path: Optional[str] = None) -> str:
+        path = path or os.path.join(self.report_dir, f"pipeline_run_{self.run_id}.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        logger.info(f"Run report saved to {path}")
+        return path
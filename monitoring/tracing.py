@@ -0,0 +1,99 @@
+# monitoring/tracing.py
+import os
+import json
+import time
+import logging
+from logging.handlers import RotatingFileHandler
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List
+from ingestion.config import DATA_DIR
+from monitoring.metrics import SEARCH_STAGE_LATENCY
+
+# Searches slower than this (end-to-end, ms) are appended to the slow-query log
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", "500"))
+SLOW_QUERY_LOG = os.environ.get("SLOW_QUERY_LOG", os.path.join(DATA_DIR, "logs", "slow_queries.jsonl"))
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
+
+_slow_query_logger = None
+
+def get_slow_query_logger() -> logging.Logger:
+    """
+    JSONL logger backed by a size-rotated file (created on first slow query).
+    """
+    global _slow_query_logger
+    if _slow_query_logger is None:
+        os.makedirs(os.path.dirname(SLOW_QUERY_LOG), exist_ok=True)
+        handler = RotatingFileHandler(
+            SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_MAX_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        slow_logger = logging.getLogger("bookfinder.slow_queries")
+        slow_logger.setLevel(logging.INFO)
+        slow_logger.propagate = False
+        slow_logger.addHandler(handler)
+        _slow_query_logger = slow_logger
+    return _slow_query_logger
+
+class SearchTrace:
+    """
+    Per-request record of stage timings and search statistics.
+    Every span also feeds the per-stage latency histogram.
+    """
+
+    def __init__(self, query: str, **params):
+        self.query = query
+        self.params = params
+        self.spans: List[Dict[str, Any]] = []
+        self.attributes: Dict[str, Any] = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            SEARCH_STAGE_LATENCY.observe(elapsed, stage=name)
+            self.spans.append({"stage": name, "ms": round(elapsed * 1000, 3)})
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_ms": round(self.total_ms, 3),
+            "spans": self.spans,
+            **self.attributes,
+        }
+
+    def server_timing(self) -> str:
+        """
+        Stage timings as a Server-Timing header value (visible in browser dev tools).
+        """
+        parts = [f"{span['stage']};dur={span['ms']}" for span in self.spans]
+        parts.append(f"total;dur={round(self.total_ms, 3)}")
+        return ", ".join(parts)
+
+    def finish(self):
+        """
+        Writes the trace to the slow-query log if it exceeded the threshold.
+        """
+        if self.total_ms < SLOW_QUERY_THRESHOLD_MS:
+            return
+        record = {
+            "timestamp": datetime.now().isoformat(),
+            "query": self.query,
+            "params": self.params,
+            **self.to_dict(),
+        }
+        try:
+            get_slow_query_logger().info(json.dumps(record, default=str))
+        except OSError as e:
+            logging.getLogger(__name__).warning(f"Could not write slow-query log: {e}")
@@ -0,0 +1,221 @@
+# pipeline/executor.py
+import time
+import queue
+import threading
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default capacity of each stage's input queue; a full queue blocks the producers (backpressure)
+DEFAULT_QUEUE_SIZE = 8
+# How often blocked threads wake up to check whether the run was aborted
+POLL_INTERVAL = 0.1
+
+_DONE = object()
+
+class _Aborted(Exception):
+    pass
+
+class _Node:
+    def __init__(self, name, func, inputs, workers, queue_size, setup, finish, is_source):
+        self.name = name
+        self.func = func
+        self.inputs = inputs
+        self.workers = workers
+        self.setup = setup
+        self.finish = finish
+        self.is_source = is_source
+        self.queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.downstream: List["_Node"] = []
+        self.open_producers = 0
+        self.running_workers = workers
+        self.ready = threading.Event()
+        self.lock = threading.Lock()
+        self.stats = {"items_in": 0, "items_out": 0, "busy_seconds": 0.0, "input_wait_seconds": 0.0, "output_wait_seconds": 0.0}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+class PipelineExecutor:
+    """
+    Runs a DAG of stages concurrently, connected by bounded queues.
+    - Sources are callables returning an iterable; every element is sent downstream
+    - Stages are called once per input item; a non-None return value is sent downstream
+    - Each stage runs on `workers` threads; a full input queue blocks its producers
+    - setup runs once before a stage consumes anything (e.g. loading a model while
+      upstream stages are still producing); finish runs once after its last item and
+      may return one final item to send downstream
+    - The first exception aborts every stage and is re-raised from run()
+    """
+
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.nodes: Dict[str, _Node] = {}
+        self._abort = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._error_stage: Optional[str] = None
+
+    def source(self, name: str, func: Callable[[], Iterable[Any]]):
+        self._add(_Node(name, func, [], 1, 1, None, None, True))
+
+    def stage(
+        self,
+        name: str,
+        func: Callable[[Any], Any],
+        inputs: List[str],
+        workers: int = 1,
+        queue_size: Optional[int] = None,
+        setup: Optional[Callable[[], None]] = None,
+        finish: Optional[Callable[[], Any]] = None
+    ):
+        self._add(_Node(name, func, inputs, max(1, workers), queue_size or self.queue_size, setup, finish, False))
+
+    def _add(self, node: _Node):
+        if node.name in self.nodes:
+            raise ValueError(f"Duplicate stage name: {node.name}")
+        for upstream in node.inputs:
+            if upstream not in self.nodes:
+                raise ValueError(f"Stage '{node.name}' depends on unknown stage '{upstream}' (add stages in order)")
+            self.nodes[upstream].downstream.append(node)
+            node.open_producers += self.nodes[upstream].workers
+        self.nodes[node.name] = node
+
+    # --- queue helpers ---
+
+    @staticmethod
+    def _count(node: _Node, key: str, value: float):
+        with node.lock:
+            node.stats[key] += value
+
+    def _put(self, node: _Node, target: _Node, item: Any):
+        start = time.perf_counter()
+        while True:
+            if self._abort.is_set():
+                raise _Aborted()
+            try:
+                target.queue.put(item, timeout=POLL_INTERVAL)
+                break
+            except queue.Full:
+                continue
+        self._count(node, "output_wait_seconds", time.perf_counter() - start)
+
+    def _get(self, node: _Node) -> Any:
+        start = time.perf_counter()
+        while True:
+            if self._abort.is_set():
+                raise _Aborted()
+            try:
+                item = node.queue.get(timeout=POLL_INTERVAL)
+                break
+            except queue.Empty:
+                continue
+        self._count(node, "input_wait_seconds", time.perf_counter() - start)
+        return item
+
+    def _emit(self, node: _Node, item: Any):
+        self._count(node, "items_out", 1)
+        for target in node.downstream:
+            self._put(node, target, item)
+
+    def _close(self, node: _Node):
+        """
+        Called when one worker of `node` exits; the last one to exit of all of a
+        stage's producers sends one end marker per downstream worker.
+        """
+        for target in node.downstream:
+            with target.lock:
+                target.open_producers -= 1
+                last = target.open_producers == 0
+            if last:
+                for _ in range(target.workers):
+                    self._put(node, target, _DONE)
+
+    # --- workers ---
+
+    def _run_worker(self, node: _Node, index: int):
+        try:
+            if index == 0:
+                if node.setup:
+                    node.setup()
+                node.ready.set()
+            else:
+                while not node.ready.wait(POLL_INTERVAL):
+                    if self._abort.is_set():
+                        raise _Aborted()
+
+            if node.is_source:
+                node.started_at = time.perf_counter()
+                iterator = iter(node.func())
+                while True:
+                    start = time.perf_counter()
+                    item = next(iterator, _DONE)
+                    self._count(node, "busy_seconds", time.perf_counter() - start)
+                    if item is _DONE:
+                        break
+                    self._emit(node, item)
+            else:
+                while True:
+                    item = self._get(node)
+                    if item is _DONE:
+                        break
+                    if node.started_at is None:
+                        node.started_at = time.perf_counter()
+                    self._count(node, "items_in", 1)
+                    start = time.perf_counter()
+                    result = node.func(item)
+                    self._count(node, "busy_seconds", time.perf_counter() - start)
+                    if result is not None:
+                        self._emit(node, result)
+
+            with node.lock:
+                node.running_workers -= 1
+                last_worker = node.running_workers == 0
+            if last_worker:
+                if node.finish:
+                    start = time.perf_counter()
+                    result = node.finish()
+                    self._count(node, "busy_seconds", time.perf_counter() - start)
+                    if result is not None:
+                        self._emit(node, result)
+                node.finished_at = time.perf_counter()
+            self._close(node)
+        except _Aborted:
+            pass
+        except BaseException as e:
+            if not self._abort.is_set():
+                self._error, self._error_stage = e, node.name
+                self._abort.set()
+            logger.error(f"Pipeline stage '{node.name}' failed: {e}")
+
+    def run(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Runs every stage to completion and returns per-stage statistics:
+        items in/out, busy time, time blocked on input (starved) and on output
+        (backpressure), and the stage's active wall time.
+        """
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._run_worker, args=(node, i), name=f"stage-{node.name}-{i}", daemon=True)
+            for node in self.nodes.values()
+            for i in range(node.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self._error is not None:
+            raise RuntimeError(f"Pipeline stage '{self._error_stage}' failed: {self._error}") from self._error
+
+        wall = time.perf_counter() - start
+        stats = {}
+        for node in self.nodes.values():
+            active = (node.finished_at - node.started_at) if node.started_at and node.finished_at else 0.0
+            stats[node.name] = {
+                "workers": node.workers,
+                **{key: round(value, 4) if isinstance(value, float) else value for key, value in node.stats.items()},
+                "active_seconds": round(active, 4),
+            }
+        logger.info(f"Pipeline finished in {wall:.2f}s: {stats}")
+        return stats
@@ -3,13 +3,17 @@ import argparse
 import logging
 import json
 import os
+import threading
 from typing import List, Dict, Any
 
-from ingestion.csv_loader import load_csv
-from ingestion.openlibrary_loader import load_all_openlibrary_data
+from ingestion.incremental import ingest_csv, ingest_openlibrary, SOURCE_CSV, SOURCE_OPENLIBRARY
 from ingestion.config import DEFAULT_CSV_PATH, SUBJECTS_TO_FETCH, DATA_DIR
 from transformation.cleaner import clean_book_record
-from storage.db import init_db, insert_books
+from storage.db import init_db, insert_books, get_watermarks, save_watermarks
+from storage.checkpoint import Checkpoint, file_checksum
+from storage.version import bump_catalog_version
+from monitoring.profiling import PipelineRunReport
+from pipeline.executor import PipelineExecutor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -19,6 +23,13 @@ logger = logging.getLogger(__name__)
 TEMP_DIR = os.path.join(DATA_DIR, "temp")
 INGESTED_FILE = os.path.join(TEMP_DIR, "ingested.json")
 TRANSFORMED_FILE = os.path.join(TEMP_DIR, "transformed.json")
+# Watermarks of the ingested input, committed by the storage stage once it is stored
+PENDING_WATERMARKS_FILE = os.path.join(TEMP_DIR, "pending_watermarks.json")
+
+# Rows per committed storage batch (the resume granularity of an interrupted run)
+STORAGE_BATCH_SIZE = 5000
+# Records per item flowing between stages of the streaming pipeline
+STREAM_BATCH_SIZE = 1000
 
 def ensure_temp_dir():
     os.makedirs(TEMP_DIR, exist_ok=True)
@@ -46,37 +57,34 @@ BOLD = '\033[1m'
 def log_step(message):
     logger.info(f"{BOLD}{CYAN}>>> {message}{RESET}")
 
-def run_ingestion(limit: int = 20):
+def run_ingestion(limit: int = 20, full_refresh: bool = False):
     log_step("Starting Ingestion Phase...")
-    
-    # 1. Load from CSV
+
+    # Watermarks live in the DB, so make sure the table exists
+    init_db()
+
+    # 1. Load new/changed rows from CSV
     logger.info(f"Loading from CSV: {DEFAULT_CSV_PATH}")
-    csv_books = load_csv(DEFAULT_CSV_PATH)
+    csv_books, csv_pending = ingest_csv(DEFAULT_CSV_PATH, get_watermarks(SOURCE_CSV), full_refresh)
     
-    # 2. Load from API
+    # 2. Load the next page per subject from API
     logger.info(f"Loading from OpenLibrary API for subjects: {SUBJECTS_TO_FETCH} with limit={limit}")
-    api_books = load_all_openlibrary_data(SUBJECTS_TO_FETCH, limit=limit)
+    api_books, api_pending = ingest_openlibrary(SUBJECTS_TO_FETCH, limit, get_watermarks(SOURCE_OPENLIBRARY), full_refresh)
     
     all_books = csv_books + api_books
-    logger.info(f"{GREEN}Ingestion complete. Total records: {len(all_books)}{RESET}")
+    logger.info(f"{GREEN}Ingestion complete. New records: {len(all_books)}{RESET}")
     
     save_temp_data(all_books, INGESTED_FILE)
+    save_temp_data(csv_pending + api_pending, PENDING_WATERMARKS_FILE)
+    return {"records_in": None, "records_out": len(all_books)}
 
-def run_transformation():
-    log_step("Starting Transformation Phase...")
-    
-    raw_books = load_temp_data(INGESTED_FILE)
-    if not raw_books:
-        logger.warning(f"{YELLOW}No data to transform.{RESET}")
-        return
-
-    # Deduplication Logic
+def dedup_cleaned(cleaned: List[Dict[str, Any]], seen: set) -> List[Dict[str, Any]]:
+    """
+    Drops untitled records and repeats of (title, author) already in `seen`
+    (shared across batches when the pipeline streams).
+    """
     cleaned_books = []
-    seen = set() # Store tuples of (title_lower, author_lower)
-
-    for book in raw_books:
-        clean_book = clean_book_record(book)
-        
+    for clean_book in cleaned:
         # Create a unique key
         t = (clean_book.get('title') or "").lower()
         a = (clean_book.get('author') or "").lower()
@@ -85,49 +93,196 @@ def run_transformation():
         if key not in seen and t: # Ensure title exists
             seen.add(key)
             cleaned_books.append(clean_book)
-        
+    return cleaned_books
+
+def run_transformation():
+    log_step("Starting Transformation Phase...")
+    
+    raw_books = load_temp_data(INGESTED_FILE)
+    if not raw_books:
+        logger.warning(f"{YELLOW}No data to transform.{RESET}")
+        # Still written, so storage doesn't re-store an older batch
+        save_temp_data([], TRANSFORMED_FILE)
+        return {"records_in": 0, "records_out": 0}
+
+    cleaned_books = dedup_cleaned([clean_book_record(book) for book in raw_books], set())
     logger.info(f"{GREEN}Transformation complete. Processed {len(cleaned_books)} unique records (dropped {len(raw_books) - len(cleaned_books)} duplicates).{RESET}")
     save_temp_data(cleaned_books, TRANSFORMED_FILE)
+    return {"records_in": len(raw_books), "records_out": len(cleaned_books)}
+
+def load_pending_watermarks() -> List[Dict[str, Any]]:
+    """
+    Watermarks from the last ingestion, but only if the transformed file was
+    produced after it; otherwise committing them would skip unstored input.
+    """
+    if not os.path.exists(PENDING_WATERMARKS_FILE):
+        return []
+    if not os.path.exists(TRANSFORMED_FILE) or os.path.getmtime(TRANSFORMED_FILE) < os.path.getmtime(PENDING_WATERMARKS_FILE):
+        logger.warning(f"{YELLOW}Transformed data predates the last ingestion; watermarks not advanced (run --transform).{RESET}")
+        return []
+    return load_temp_data(PENDING_WATERMARKS_FILE)
+
+def commit_watermarks(pending_watermarks: List[Dict[str, Any]]):
+    if not save_watermarks(pending_watermarks):
+        raise RuntimeError("Ingestion watermarks could not be saved")
+    if os.path.exists(PENDING_WATERMARKS_FILE):
+        os.remove(PENDING_WATERMARKS_FILE)
+
+def store_batch(books: List[Dict[str, Any]]) -> int:
+    # A failed batch must stop the run before it is checkpointed or watermarks advance
+    inserted = insert_books(books)
+    if inserted is None:
+        raise RuntimeError("Books could not be stored")
+    return inserted
 
 def run_storage():
     log_step("Starting Storage Phase...")
     
+    # Initialize DB (idempotent); also creates missing indexes on an existing database
+    init_db()
+
     books_to_store = load_temp_data(TRANSFORMED_FILE)
+    pending_watermarks = load_pending_watermarks()
     if not books_to_store:
         logger.warning(f"{YELLOW}No data to store.{RESET}")
-        return
-
-    # Initialize DB (idempotent)
-    init_db()
+        commit_watermarks(pending_watermarks)
+        return {"records_in": 0, "records_out": 0}
     
-    # Insert
-    insert_books(books_to_store)
+    # Insert in committed batches; an interrupted run resumes after the last one
+    checkpoint = Checkpoint("storage", file_checksum(TRANSFORMED_FILE))
+    state = checkpoint.load()
+    batches_done = state.get("batches_done", 0)
+    inserted = state.get("inserted", 0)
+
+    for start in range(batches_done * STORAGE_BATCH_SIZE, len(books_to_store), STORAGE_BATCH_SIZE):
+        inserted += store_batch(books_to_store[start:start + STORAGE_BATCH_SIZE])
+        batches_done += 1
+        checkpoint.save({"batches_done": batches_done, "inserted": inserted})
+
+    commit_watermarks(pending_watermarks)
+    checkpoint.clear()
+    if inserted:
+        bump_catalog_version("db")
     logger.info(f"{GREEN}Storage Phase complete.{RESET}")
+    return {"records_in": len(books_to_store), "records_out": inserted}
 
-from transformation.embedder import load_model, generate_embeddings, save_embeddings
-from storage.db import get_recent_books
+from transformation.embedder import EMBEDDING_BATCH_SIZE, EMBEDDING_WORKERS, EMBEDDING_STORAGE
+from transformation.index_builder import IncrementalIndexBuilder
+from search.vector_index import STORAGE_TYPES
 
-def run_embedding():
+def run_embedding(
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    workers: int = EMBEDDING_WORKERS,
+    storage: str = EMBEDDING_STORAGE,
+    full_refresh: bool = False
+):
     log_step("Starting Embedding Phase...")
-    
-    # Fetch all books from DB to embed
-    # Using a large limit to get all (for this scale)
-    books = get_recent_books(limit=100000)
-    if not books:
-        logger.warning(f"{YELLOW}No books found in DB to embed.{RESET}")
-        return
-
-    model = load_model()
-    data = generate_embeddings(books, model)
-    
-    save_embeddings(data)
+    builder = IncrementalIndexBuilder(batch_size=batch_size, workers=workers, storage=storage, full_refresh=full_refresh)
+    counts = builder.finish()
     logger.info(f"{GREEN}Embedding Phase complete.{RESET}")
+    return counts
+
+def run_onnx_export():
+    log_step("Exporting ONNX Encoder...")
+    from transformation.onnx_encoder import export_onnx_model, verify_onnx_encoder
+
+    reference = export_onnx_model()
+    for quantize in (False, True):
+        report = verify_onnx_encoder(reference_model=reference, quantize=quantize)
+        color = GREEN if report["passed"] else YELLOW
+        logger.info(f"{color}ONNX accuracy check: {json.dumps(report)}{RESET}")
+
+def run_streaming(
+    limit: int = 20,
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    workers: int = EMBEDDING_WORKERS,
+    storage: str = EMBEDDING_STORAGE,
+    full_refresh: bool = False,
+    fetch_workers: int = 1,
+    clean_workers: int = 1
+):
+    """
+    All stages at once as a DAG connected by bounded queues:
+    csv + openlibrary -> clean -> store -> embed.
+    Cleaning starts on the first fetched batch, storage commits batches while
+    cleaning continues, and embedding encodes newly stored rows (its model loads
+    while ingestion runs). Watermarks are committed only after the whole DAG succeeds;
+    an interrupted run re-reads the same input and INSERT OR IGNORE skips stored rows.
+    """
+    log_step("Starting Streaming Pipeline...")
+    init_db()
+    csv_watermarks = get_watermarks(SOURCE_CSV)
+    api_watermarks = get_watermarks(SOURCE_OPENLIBRARY)
+    pending_watermarks: List[Dict[str, Any]] = []
+    seen: set = set()
+    seen_lock = threading.Lock()
+    totals = {"ingested": 0, "inserted": 0}
+    state: Dict[str, Any] = {}
 
-def run_all(limit: int = 20):
-    run_ingestion(limit=limit)
-    run_transformation()
-    run_storage()
-    run_embedding()
+    def csv_batches():
+        books, pending = ingest_csv(DEFAULT_CSV_PATH, csv_watermarks, full_refresh)
+        pending_watermarks.extend(pending)
+        for start in range(0, len(books), STREAM_BATCH_SIZE):
+            yield books[start:start + STREAM_BATCH_SIZE]
+
+    def fetch_subject(subject: str):
+        books, pending = ingest_openlibrary([subject], limit, api_watermarks, full_refresh)
+        pending_watermarks.extend(pending)
+        return books or None
+
+    def clean(batch: List[Dict[str, Any]]):
+        cleaned = [clean_book_record(book) for book in batch]
+        with seen_lock:
+            totals["ingested"] += len(batch)
+            unique = dedup_cleaned(cleaned, seen)
+        return unique or None
+
+    def store(batch: List[Dict[str, Any]]):
+        inserted = store_batch(batch)
+        totals["inserted"] += inserted
+        return inserted or None
+
+    def store_finish():
+        if totals["inserted"]:
+            bump_catalog_version("db")
+
+    def embed(_inserted: int):
+        state["builder"].embed_pending(final=False)
+
+    def embed_setup():
+        state["builder"] = IncrementalIndexBuilder(batch_size=batch_size, workers=workers, storage=storage, full_refresh=full_refresh)
+        state["builder"].load_model()
+
+    def embed_finish():
+        state["counts"] = state["builder"].finish()
+
+    executor = PipelineExecutor()
+    executor.source("csv", csv_batches)
+    executor.source("subjects", lambda: list(SUBJECTS_TO_FETCH))
+    executor.stage("openlibrary", fetch_subject, inputs=["subjects"], workers=fetch_workers)
+    executor.stage("clean", clean, inputs=["csv", "openlibrary"], workers=clean_workers)
+    # SQLite has a single writer, so storage stays on one worker
+    executor.stage("store", store, inputs=["clean"], finish=store_finish)
+    executor.stage("embed", embed, inputs=["store"], setup=embed_setup, finish=embed_finish)
+    stage_stats = executor.run()
+
+    commit_watermarks(pending_watermarks)
+    logger.info(f"{BOLD}{GREEN}Streaming Pipeline Complete: {totals['ingested']} ingested, {totals['inserted']} stored, index holds {state['counts']['records_out']} 🚀{RESET}")
+    return {"records_in": totals["ingested"], "records_out": totals["inserted"], "details": stage_stats}
+
+def run_all(
+    limit: int = 20,
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    workers: int = EMBEDDING_WORKERS,
+    storage: str = EMBEDDING_STORAGE,
+    full_refresh: bool = False,
+    report: PipelineRunReport = None
+):
+    report = report or PipelineRunReport()
+    report.run("ingestion", run_ingestion, limit=limit, full_refresh=full_refresh)
+    report.run("transformation", run_transformation)
+    report.run("storage", run_storage)
+    report.run("embedding", run_embedding, batch_size=batch_size, workers=workers, storage=storage, full_refresh=full_refresh)
     logger.info(f"{BOLD}{GREEN}Full Pipeline Run Complete 🚀{RESET}")
 
 def main():
@@ -136,26 +291,58 @@ def main():
     parser.add_argument("--transform", action="store_true", help="Run Transformation Phase")
     parser.add_argument("--store", action="store_true", help="Run Storage Phase")
     parser.add_argument("--embed", action="store_true", help="Run Embedding Phase (New)")
-    parser.add_argument("--all", action="store_true", help="Run All Phases")
+    parser.add_argument("--all", action="store_true", help="Run All Phases (overlapped, as a streaming DAG)")
+    parser.add_argument("--sequential", action="store_true", help="With --all: run phases one after another via temp files")
+    parser.add_argument("--fetch-workers", type=int, default=1, help="Concurrent OpenLibrary subject fetches (streaming); request starts stay OPENLIBRARY_REQUEST_DELAY apart across workers")
+    parser.add_argument("--clean-workers", type=int, default=1, help="Cleaning worker threads (streaming)")
+    parser.add_argument("--export-onnx", action="store_true", help="Export and verify the ONNX query encoder")
     parser.add_argument("--limit", type=int, default=20, help="Limit number of books per subject from API")
     parser.add_argument("--target", type=int, dest='limit', help="Alias for --limit") # Support user's target arg
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_BATCH_SIZE, help="Embedding encode batch size")
+    parser.add_argument("--workers", type=int, default=EMBEDDING_WORKERS, help="Embedding worker processes (0 = all CPU cores)")
+    parser.add_argument("--storage", choices=STORAGE_TYPES, default=EMBEDDING_STORAGE, help="In-memory embedding format (int8: 4x less RAM, same scan speed; float16: 2x less RAM, pre-filtered scans only)")
+    parser.add_argument("--full-refresh", action="store_true", help="Ignore watermarks and re-embed every book (e.g. after a model change)")
+    parser.add_argument("--profile", action="store_true", help="Dump a cProfile .prof file per stage")
+    parser.add_argument("--report", default=None, help="Run report path (default: data/reports/pipeline_run_<id>.json)")
     
     args = parser.parse_args()
-    
-    if args.all:
-        run_all(limit=args.limit)
-    else:
-        if args.ingest:
-            run_ingestion(limit=args.limit)
-        if args.transform:
-            run_transformation()
-        if args.store:
-            run_storage()
-        if args.embed:
-            run_embedding()
-            
-    if not (args.ingest or args.transform or args.store or args.embed or args.all):
+    if args.workers == 0:
+        args.workers = os.cpu_count() or 1
+
+    if not (args.ingest or args.transform or args.store or args.embed or args.export_onnx or args.all):
         parser.print_help()
+        return
+
+    report = PipelineRunReport(profile=args.profile)
+    try:
+        if args.all and args.sequential:
+            run_all(
+                limit=args.limit, batch_size=args.batch_size, workers=args.workers,
+                storage=args.storage, full_refresh=args.full_refresh, report=report
+            )
+        elif args.all:
+            report.run(
+                "pipeline", run_streaming, limit=args.limit, batch_size=args.batch_size, workers=args.workers,
+                storage=args.storage, full_refresh=args.full_refresh,
+                fetch_workers=args.fetch_workers, clean_workers=args.clean_workers
+            )
+        else:
+            if args.ingest:
+                report.run("ingestion", run_ingestion, limit=args.limit, full_refresh=args.full_refresh)
+            if args.transform:
+                report.run("transformation", run_transformation)
+            if args.store:
+                report.run("storage", run_storage)
+            if args.embed:
+                report.run(
+                    "embedding", run_embedding, batch_size=args.batch_size, workers=args.workers,
+                    storage=args.storage, full_refresh=args.full_refresh
+                )
+            if args.export_onnx:
+                report.run("onnx_export", run_onnx_export)
+    finally:
+        # Written even when a stage fails, so the report shows where it stopped
+        report.save(args.report)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,75 @@
+# search/api_client.py
+import os
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import List, Dict, Any, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# 'local' loads the model in-process; 'api' delegates search to the FastAPI service
+SEARCH_MODE = os.environ.get("SEARCH_MODE", "local")
+SEARCH_API_URL = os.environ.get("SEARCH_API_URL", "http://127.0.0.1:8000").rstrip("/")
+# (connect, read) timeouts in seconds
+SEARCH_API_TIMEOUT = (
+    float(os.environ.get("SEARCH_API_CONNECT_TIMEOUT", "2")),
+    float(os.environ.get("SEARCH_API_READ_TIMEOUT", "10")),
+)
+# Keep-alive connections held per UI process
+SEARCH_API_POOL_SIZE = int(os.environ.get("SEARCH_API_POOL_SIZE", "10"))
+# Largest `limit` the /search endpoint accepts
+API_MAX_RESULTS = 50
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    """
+    Returns the process-wide pooled HTTP session (created on first use).
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=2,
+                    backoff_factor=0.2,
+                    status_forcelist=(502, 504),
+                    allowed_methods=("GET",),
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=SEARCH_API_POOL_SIZE,
+                    max_retries=retry,
+                )
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+def search_page_via_api(
+    query_text: str,
+    limit: int,
+    offset: int = 0,
+    genres: Optional[List[str]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Calls the API's /search endpoint for one page of the query's ranked results.
+    Returns the response body ('results', each with a 'score', and 'next_offset'),
+    or None if the service failed.
+    """
+    params = {"q": query_text, "limit": limit, "offset": offset}
+    if genres:
+        params["genre"] = list(genres)
+
+    try:
+        response = get_session().get(f"{SEARCH_API_URL}/search", params=params, timeout=SEARCH_API_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+    except (requests.RequestException, ValueError) as e:
+        logger.error(f"Search API request failed: {e}")
+        return None
@@ -0,0 +1,57 @@
+# search/binary_index.py
+import numpy as np
+from typing import Optional
+
+# Byte popcount table for NumPy builds without np.bitwise_count (< 2.0)
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+# Hamming distances are computed in blocks to bound temporary memory
+HAMMING_BLOCK_ROWS = 65536
+
+def pack_sign_bits(embeddings: np.ndarray) -> np.ndarray:
+    """
+    Packs the sign bit of every dimension into uint64 words.
+    A 384-dim vector becomes 6 words (48 bytes) instead of 1536 bytes of float32.
+    """
+    embeddings = np.atleast_2d(np.asarray(embeddings))
+    packed = np.packbits(embeddings > 0, axis=1)
+
+    # Pad each row to a whole number of 64-bit words
+    pad = (-packed.shape[1]) % 8
+    if pad:
+        packed = np.pad(packed, ((0, 0), (0, pad)))
+    return np.ascontiguousarray(packed).view(np.uint64)
+
+def _row_popcount(words: np.ndarray) -> np.ndarray:
+    """
+    Number of set bits per row of a (n, words) uint64 array.
+    """
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.uint16)
+    return _POPCOUNT_TABLE[np.ascontiguousarray(words).view(np.uint8)].sum(axis=1, dtype=np.uint16)
+
+def hamming_distances(codes: np.ndarray, query_code: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Hamming distance between a packed query code and stored codes (all rows if `rows` is None).
+    """
+    query_code = np.asarray(query_code, dtype=np.uint64).reshape(1, -1)
+    n = codes.shape[0] if rows is None else len(rows)
+    distances = np.empty(n, dtype=np.uint16)
+    for start in range(0, n, HAMMING_BLOCK_ROWS):
+        end = min(start + HAMMING_BLOCK_ROWS, n)
+        block = codes[start:end] if rows is None else codes[rows[start:end]]
+        distances[start:end] = _row_popcount(block ^ query_code)
+    return distances
+
+def hamming_shortlist(codes: np.ndarray, query_vec: np.ndarray, size: int, rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Row indices of the `size` codes closest to the query's sign code, in ascending row order.
+    """
+    distances = hamming_distances(codes, pack_sign_bits(query_vec)[0], rows)
+    if size < len(distances):
+        local = np.argpartition(distances, size - 1)[:size]
+    else:
+        local = np.arange(len(distances))
+    shortlist = local if rows is None else np.asarray(rows)[local]
+    # Ascending order keeps the exact rerank reads sequential
+    return np.sort(shortlist)
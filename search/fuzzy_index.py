@@ -0,0 +1,143 @@
+# search/fuzzy_index.py
+import re
+import logging
+import unicodedata
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+FIELD_TITLE = "title"
+FIELD_AUTHOR = "author"
+FIELDS = (FIELD_TITLE, FIELD_AUTHOR)
+
+# Matches below this trigram similarity are noise (pg_trgm uses 0.3 too)
+MIN_SIMILARITY = 0.3
+# Book ids returned per matched entry (an author can have hundreds of books)
+MAX_BOOKS_PER_MATCH = 20
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+def normalize_text(text: Optional[str]) -> str:
+    """
+    Lowercases, strips accents and punctuation, and collapses whitespace,
+    so "Gabriel García Márquez" and "gabriel garcia marquez" index the same.
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return " ".join(_NON_ALNUM.sub(" ", text.lower()).split())
+
+def trigrams(text: str) -> set:
+    """
+    pg_trgm-style trigrams of normalized text: each word is padded with two
+    leading spaces and one trailing space, so short words and word starts count.
+    """
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class TrigramIndex:
+    """
+    In-memory inverted index from trigrams to distinct titles and authors.
+    - Postings are stored CSR-style: one sorted int32 array of entry ids plus offsets
+    - Lookup counts shared trigrams with one np.bincount over the query's postings
+      and ranks by Jaccard similarity |q ∩ e| / |q ∪ e|
+    """
+
+    def __init__(self, rows: Sequence[Dict[str, Any]]):
+        entry_keys: Dict[Tuple[str, str], int] = {}
+        self.fields: List[str] = []
+        self.values: List[str] = []
+        books: List[List[int]] = []
+        for row in rows:
+            for field in FIELDS:
+                value = row.get(field)
+                normalized = normalize_text(value)
+                if not normalized:
+                    continue
+                key = (field, normalized)
+                entry = entry_keys.get(key)
+                if entry is None:
+                    entry = entry_keys[key] = len(self.values)
+                    self.fields.append(field)
+                    self.values.append(value.strip())
+                    books.append([])
+                books[entry].append(row['id'])
+        self.book_ids = books
+
+        vocabulary: Dict[str, int] = {}
+        gram_ids: List[int] = []
+        gram_entries: List[int] = []
+        sizes = np.zeros(len(self.values), dtype=np.int32)
+        for (field, normalized), entry in entry_keys.items():
+            grams = trigrams(normalized)
+            sizes[entry] = len(grams)
+            gram_ids.extend([vocabulary.setdefault(gram, len(vocabulary)) for gram in grams])
+            gram_entries.extend([entry] * len(grams))
+
+        gram_ids = np.asarray(gram_ids, dtype=np.int32)
+        order = np.argsort(gram_ids, kind='stable')
+        self.vocabulary = vocabulary
+        self.postings = np.asarray(gram_entries, dtype=np.int32)[order]
+        self.offsets = np.searchsorted(gram_ids[order], np.arange(len(vocabulary) + 1))
+        self.sizes = sizes
+        self.field_codes = np.array([FIELDS.index(f) for f in self.fields], dtype=np.int8)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def lookup(
+        self,
+        query: str,
+        limit: int = 10,
+        field: Optional[str] = None,
+        min_similarity: float = MIN_SIMILARITY
+    ) -> List[Dict[str, Any]]:
+        """
+        Closest titles/authors to a possibly misspelled query, best first.
+        Returns dicts with field, value, similarity and (up to MAX_BOOKS_PER_MATCH) book_ids.
+        """
+        grams = trigrams(normalize_text(query))
+        known = [self.vocabulary[g] for g in grams if g in self.vocabulary]
+        if not known or not len(self.values):
+            return []
+
+        hits = np.concatenate([self.postings[self.offsets[g]:self.offsets[g + 1]] for g in known])
+        shared = np.bincount(hits, minlength=len(self.values))
+        candidates = np.flatnonzero(shared)
+        if field is not None:
+            candidates = candidates[self.field_codes[candidates] == FIELDS.index(field)]
+
+        common = shared[candidates]
+        similarity = common / (len(grams) + self.sizes[candidates] - common)
+        keep = similarity >= min_similarity
+        candidates, similarity = candidates[keep], similarity[keep]
+
+        if len(candidates) > limit:
+            top = np.argpartition(-similarity, limit - 1)[:limit]
+            candidates, similarity = candidates[top], similarity[top]
+        order = np.argsort(-similarity, kind='stable')
+
+        return [
+            {
+                "field": self.fields[entry],
+                "value": self.values[entry],
+                "similarity": round(float(sim), 4),
+                "book_ids": self.book_ids[entry][:MAX_BOOKS_PER_MATCH],
+            }
+            for entry, sim in zip(candidates[order], similarity[order])
+        ]
+
+def build_trigram_index() -> TrigramIndex:
+    """
+    Builds the index over every book's title and author from the database.
+    """
+    from storage.db import get_lookup_rows
+    rows = get_lookup_rows()
+    index = TrigramIndex(rows)
+    logger.info(f"Trigram index: {len(index)} titles/authors, {len(index.vocabulary)} trigrams.")
+    return index
@@ -0,0 +1,197 @@
+# search/knn_graph.py
+import os
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+from search.ranking import DUPLICATE_SIMILARITY
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Neighbours kept per book
+KNN_NEIGHBORS = int(os.environ.get("KNN_NEIGHBORS", "20"))
+# Tile shape of the blocked similarity product: 512 x 8192 float32 = 16 MB per worker
+KNN_BLOCK_ROWS = 512
+KNN_BLOCK_COLS = 8192
+# Threads computing row blocks; NumPy releases the GIL in matmul and partitioning
+KNN_WORKERS = int(os.environ.get("KNN_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+def _merge_top(best_scores: np.ndarray, best_rows: np.ndarray, scores: np.ndarray, rows: np.ndarray, k: int):
+    """
+    Row-wise top-k of the union of two (b, *) candidate sets.
+    """
+    scores = np.concatenate([best_scores, scores], axis=1)
+    rows = np.concatenate([best_rows, rows], axis=1)
+    if scores.shape[1] > k:
+        keep = np.argpartition(scores, -k, axis=1)[:, -k:]
+        scores = np.take_along_axis(scores, keep, axis=1)
+        rows = np.take_along_axis(rows, keep, axis=1)
+    return scores, rows
+
+def _block_neighbors(
+    embeddings: np.ndarray, start: int, stop: int, k: int, duplicate_similarity: Optional[float], col_start: int = 0
+):
+    """
+    Top-k neighbours of rows [start, stop) against rows [col_start, n), one column tile at a time.
+    """
+    queries = embeddings[start:stop]
+    b = stop - start
+    best_scores = np.full((b, 0), -np.inf, dtype=np.float32)
+    best_rows = np.empty((b, 0), dtype=np.int64)
+    diagonal = np.arange(b)
+
+    for col in range(col_start, embeddings.shape[0], KNN_BLOCK_COLS):
+        tile = queries @ embeddings[col:col + KNN_BLOCK_COLS].T
+
+        # A book is not its own neighbour, nor is a near-identical copy of it
+        overlap = (start + diagonal >= col) & (start + diagonal < col + tile.shape[1])
+        tile[diagonal[overlap], start + diagonal[overlap] - col] = -np.inf
+        if duplicate_similarity is not None:
+            tile[tile >= duplicate_similarity] = -np.inf
+
+        kk = min(k, tile.shape[1])
+        part = np.argpartition(tile, -kk, axis=1)[:, -kk:]
+        best_scores, best_rows = _merge_top(
+            best_scores, best_rows, np.take_along_axis(tile, part, axis=1), part + col, k
+        )
+
+    # Best first
+    order = np.argsort(-best_scores, axis=1, kind='stable')
+    return start, np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+def _knn_rows(
+    embeddings: np.ndarray, row_start: int, row_stop: int, col_start: int, k: int, workers: int,
+    duplicate_similarity: Optional[float]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k neighbours of rows [row_start, row_stop) among rows [col_start, n), as (b, k)
+    arrays best first; empty slots have row -1 and score -inf.
+    """
+    b = row_stop - row_start
+    neighbor_rows = np.full((b, k), -1, dtype=np.int64)
+    neighbor_scores = np.full((b, k), -np.inf, dtype=np.float32)
+    if b <= 0 or k == 0 or col_start >= embeddings.shape[0]:
+        return neighbor_rows, neighbor_scores
+
+    blocks = [(start, min(start + KNN_BLOCK_ROWS, row_stop)) for start in range(row_start, row_stop, KNN_BLOCK_ROWS)]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [
+            pool.submit(_block_neighbors, embeddings, start, stop, k, duplicate_similarity, col_start)
+            for start, stop in blocks
+        ]
+        for future in futures:
+            start, rows, scores = future.result()
+            offset = start - row_start
+            neighbor_rows[offset:offset + len(rows), :rows.shape[1]] = rows
+            neighbor_scores[offset:offset + len(rows), :rows.shape[1]] = scores
+
+    neighbor_rows[~np.isfinite(neighbor_scores)] = -1
+    return neighbor_rows, neighbor_scores
+
+def compute_knn_graph(
+    embeddings: np.ndarray,
+    k: int = KNN_NEIGHBORS,
+    workers: int = KNN_WORKERS,
+    duplicate_similarity: Optional[float] = DUPLICATE_SIMILARITY
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact k-nearest-neighbour graph over normalized embeddings (cosine = dot product).
+    - Blocked matrix multiplication bounds temporary memory to one tile per worker
+    - Row blocks are spread over a thread pool
+    Returns (neighbour rows, scores), both (n, k) and best first. Slots without a
+    neighbour (tiny catalogs) have row -1 and score -inf.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    n = embeddings.shape[0]
+    k = max(0, min(k, n - 1))
+    return _knn_rows(embeddings, 0, n, 0, k, workers, duplicate_similarity)
+
+def update_knn_graph(
+    embeddings: np.ndarray,
+    neighbor_rows: np.ndarray,
+    neighbor_scores: np.ndarray,
+    k: int = KNN_NEIGHBORS,
+    workers: int = KNN_WORKERS,
+    duplicate_similarity: Optional[float] = DUPLICATE_SIMILARITY
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Extends a graph over the first len(neighbor_rows) embeddings to all of them.
+    - Rows appended since (the new books) get neighbours among every row
+    - Existing rows only score the new rows and merge them into their current top-k,
+      so the cost is O(new x n) instead of O(n^2)
+    Returns (neighbour rows, scores, changed), where changed flags rows whose list differs.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    n, n_old = embeddings.shape[0], len(neighbor_rows)
+    k = max(0, min(k, n - 1))
+
+    # Stored lists may be shorter than k when the catalog was tiny
+    old_rows = np.full((n_old, k), -1, dtype=np.int64)
+    old_scores = np.full((n_old, k), -np.inf, dtype=np.float32)
+    width = min(k, neighbor_rows.shape[1] if neighbor_rows.ndim == 2 else 0)
+    old_rows[:, :width] = neighbor_rows[:, :width]
+    old_scores[:, :width] = neighbor_scores[:, :width]
+
+    new_rows, new_scores = _knn_rows(embeddings, n_old, n, 0, k, workers, duplicate_similarity)
+    found_rows, found_scores = _knn_rows(embeddings, 0, n_old, n_old, k, workers, duplicate_similarity)
+
+    merged_scores, merged_rows = _merge_top(old_scores, old_rows, found_scores, found_rows, k)
+    order = np.argsort(-merged_scores, axis=1, kind='stable')
+    merged_rows = np.take_along_axis(merged_rows, order, axis=1)
+    merged_scores = np.take_along_axis(merged_scores, order, axis=1)
+    merged_rows[~np.isfinite(merged_scores)] = -1
+    changed = np.concatenate([(merged_rows >= n_old).any(axis=1), np.ones(n - n_old, dtype=bool)])
+
+    return (
+        np.concatenate([merged_rows, new_rows]),
+        np.concatenate([merged_scores, new_scores]),
+        changed,
+    )
+
+def pack_knn_graph(
+    ids: Sequence[int],
+    neighbor_rows: np.ndarray,
+    neighbor_scores: np.ndarray,
+    rows: Optional[np.ndarray] = None
+) -> List[Tuple[int, bytes, bytes]]:
+    """
+    Rows for the book_neighbors table: neighbour book ids as int32 and scores as float16,
+    little-endian (k=20 is 120 bytes per book). Empty slots are dropped.
+    `rows` gives the index rows the lists belong to when only some are packed.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    owners = ids if rows is None else ids[rows]
+    packed = []
+    for book_id, rows, scores in zip(owners, neighbor_rows, neighbor_scores):
+        rows = rows[rows >= 0]
+        packed.append((
+            int(book_id),
+            ids[rows].astype('<i4').tobytes(),
+            scores[:len(rows)].astype('<f2').tobytes(),
+        ))
+    return packed
+
+def unpack_knn_graph(ids: Sequence[int], packed: Sequence[Tuple[int, bytes, bytes]]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Inverse of pack_knn_graph for the books in `ids`, as (rows, scores) arrays.
+    Returns None if the stored lists do not cover exactly these books (the graph
+    then has to be rebuilt).
+    """
+    positions = {int(book_id): row for row, book_id in enumerate(ids)}
+    if len(packed) != len(positions):
+        return None
+
+    width = max((len(neighbor_ids) // 4 for _, neighbor_ids, _ in packed), default=0)
+    neighbor_rows = np.full((len(positions), width), -1, dtype=np.int64)
+    neighbor_scores = np.full((len(positions), width), -np.inf, dtype=np.float32)
+    for book_id, neighbor_ids, scores in packed:
+        row = positions.get(int(book_id))
+        if row is None:
+            return None
+        rows = [positions.get(neighbor, -1) for neighbor in np.frombuffer(neighbor_ids, dtype='<i4').tolist()]
+        if -1 in rows:
+            return None
+        neighbor_rows[row, :len(rows)] = rows
+        neighbor_scores[row, :len(rows)] = np.frombuffer(scores, dtype='<f2')
+    return neighbor_rows, neighbor_scores
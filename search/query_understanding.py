@@ -0,0 +1,91 @@
+# search/query_understanding.py
+import os
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from search.fuzzy_index import normalize_text
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Keyword/phrase -> DB genre substrings; override with a JSON file of the same shape
+GENRE_SYNONYMS_FILE = os.environ.get(
+    "GENRE_SYNONYMS_FILE", os.path.join(os.path.dirname(__file__), "genre_synonyms.json")
+)
+
+def load_genre_synonyms(path: str = GENRE_SYNONYMS_FILE) -> Dict[str, List[str]]:
+    """
+    Reads the synonym dictionary. Returns {} (no detection) if it is missing or invalid.
+    """
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not load genre synonyms from {path}: {e}")
+        return {}
+
+class QueryParser:
+    """
+    Detects genre keywords in a query, on word boundaries.
+    - Phrases are normalized like the query ("Sci-Fi" == "sci fi") and compiled into
+      one table keyed by word tuples
+    - Parsing tries the longest phrase first at each word, so cost depends on the
+      query length and the longest phrase, not on how many synonyms exist
+    - A trailing plural "s" is tolerated ("thrillers", "memoirs")
+    """
+
+    def __init__(self, synonyms: Dict[str, Iterable[str]]):
+        self.phrases: Dict[Tuple[str, ...], Tuple[str, Set[str]]] = {}
+        for keyword, genres in synonyms.items():
+            words = tuple(normalize_text(keyword).split())
+            if not words:
+                continue
+            _, existing = self.phrases.setdefault(words, (keyword, set()))
+            existing.update(g.lower() for g in genres)
+        self.max_words = max((len(words) for words in self.phrases), default=0)
+
+    def _match(self, words: List[str], start: int) -> Optional[Tuple[int, str, Set[str]]]:
+        for n in range(min(self.max_words, len(words) - start), 0, -1):
+            key = tuple(words[start:start + n])
+            found = self.phrases.get(key)
+            if found is None and len(key[-1]) > 3 and key[-1].endswith("s"):
+                found = self.phrases.get(key[:-1] + (key[-1][:-1],))
+            if found is not None:
+                return n, found[0], found[1]
+        return None
+
+    def parse(self, query: str) -> Dict[str, Any]:
+        """
+        Returns {"genres": sorted DB genre substrings, "keywords": matched dictionary keys}.
+        """
+        words = normalize_text(query).split()
+        genres: Set[str] = set()
+        keywords: List[str] = []
+        i = 0
+        while i < len(words):
+            match = self._match(words, i)
+            if match is None:
+                i += 1
+                continue
+            n, keyword, mapped = match
+            keywords.append(keyword)
+            genres.update(mapped)
+            i += n
+        return {"genres": sorted(genres), "keywords": keywords}
+
+_parser: Optional[QueryParser] = None
+
+def get_query_parser() -> QueryParser:
+    """
+    Process-wide parser, compiled from the synonym file on first use.
+    """
+    global _parser
+    if _parser is None:
+        _parser = QueryParser(load_genre_synonyms())
+    return _parser
+
+def detect_genres(query_text: str) -> Set[str]:
+    """
+    Maps genre keywords in the query to DB genre substrings.
+    """
+    return set(get_query_parser().parse(query_text)["genres"])
@@ -0,0 +1,140 @@
+# search/ranking.py
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from search.vector_index import candidate_vectors
+
+# Maximal marginal relevance: 1.0 ranks by relevance only, lower values favour variety
+DEFAULT_MMR_LAMBDA = 0.7
+# Candidates this similar to an already selected result are treated as the same book
+DUPLICATE_SIMILARITY = 0.98
+# Candidates ranked once per paged query; every page is a slice of their MMR order
+RESULTS_DEPTH = 400
+
+# Title/author lookups at least this similar to the whole query count as naming the book
+ENTITY_MATCH_SIMILARITY = 0.45
+# Share of the remaining headroom (1 - score) granted to an exact entity match
+ENTITY_BOOST = 0.5
+
+def boost_entity_matches(
+    data: Dict[str, Any],
+    id_array: np.ndarray,
+    query_vec: np.ndarray,
+    rows: np.ndarray,
+    scores: np.ndarray,
+    matches: List[Dict[str, Any]],
+    candidate_rows: Optional[np.ndarray] = None,
+    min_similarity: float = ENTITY_MATCH_SIMILARITY,
+    boost: float = ENTITY_BOOST
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Raises the scores of books whose title or author matches the query (fuzzy lookup
+    results), adding them to the candidates if the vector scan missed them.
+    - score += boost * similarity * (1 - score), so boosted scores stay below 1
+    - candidate_rows restricts added books to an active filter
+    Returns (rows, scores) re-sorted best first.
+    """
+    best: Dict[int, float] = {}
+    for match in matches:
+        if match['similarity'] < min_similarity:
+            continue
+        for book_id in match['book_ids']:
+            best[book_id] = max(best.get(book_id, 0.0), match['similarity'])
+    if not best:
+        return rows, scores
+
+    matched = np.flatnonzero(np.isin(id_array, list(best)))
+    if candidate_rows is not None:
+        matched = matched[np.isin(matched, candidate_rows)]
+    if not len(matched):
+        return rows, scores
+
+    extra = np.setdiff1d(matched, rows)
+    rows = np.concatenate([np.asarray(rows, dtype=np.int64), extra])
+    scores = np.concatenate([np.asarray(scores, dtype=np.float32), candidate_vectors(data, extra) @ query_vec])
+
+    positions = np.flatnonzero(np.isin(rows, matched))
+    similarity = np.array([best[book_id] for book_id in id_array[rows[positions]].tolist()], dtype=np.float32)
+    scores[positions] += boost * similarity * (1.0 - scores[positions])
+
+    order = np.argsort(-scores, kind='stable')
+    return rows[order], scores[order]
+
+def mmr_order(
+    vectors: np.ndarray,
+    relevance: np.ndarray,
+    k: int,
+    mmr_lambda: float = DEFAULT_MMR_LAMBDA,
+    valid: Optional[np.ndarray] = None,
+    duplicate_similarity: Optional[float] = DUPLICATE_SIMILARITY
+) -> np.ndarray:
+    """
+    Greedy MMR selection over a candidate set: each step picks the candidate maximising
+    mmr_lambda * relevance - (1 - mmr_lambda) * (max similarity to the picks so far).
+    - vectors: (n, d) normalized candidate embeddings; relevance: (n,) query scores
+    - valid: optional mask of candidates allowed to be picked
+    - near-duplicates of a pick (similarity >= duplicate_similarity) are dropped
+    The candidate Gram matrix is computed in one product up front, so each pick is
+    a few O(n) vector ops.
+    Returns positions into the candidate arrays, in selection order.
+    """
+    relevance = np.asarray(relevance, dtype=np.float32)
+    n = len(relevance)
+    if n == 0 or k <= 0:
+        return np.array([], dtype=np.int64)
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    similarities = vectors @ vectors.T
+    available = np.ones(n, dtype=bool) if valid is None else np.asarray(valid, dtype=bool).copy()
+    weighted_relevance = mmr_lambda * relevance
+    max_similarity = np.zeros(n, dtype=np.float32)
+    selected = []
+
+    mmr = np.empty(n, dtype=np.float32)
+
+    for _ in range(min(k, n)):
+        np.multiply(max_similarity, mmr_lambda - 1.0, out=mmr)
+        mmr += weighted_relevance
+        mmr[~available] = -np.inf
+        best = int(np.argmax(mmr))
+        if not available[best]:
+            break
+        selected.append(best)
+        available[best] = False
+
+        similarity = similarities[best]
+        np.maximum(max_similarity, similarity, out=max_similarity)
+        if duplicate_similarity is not None:
+            available &= similarity < duplicate_similarity
+
+    return np.array(selected, dtype=np.int64)
+
+def _book_keys(book: Dict[str, Any]) -> List[Any]:
+    """
+    Identity keys of a book: normalized title+author, and its ISBN if it has one.
+    """
+    keys: List[Any] = [((book.get('title') or '').lower().strip(), (book.get('author') or '').lower().strip())]
+    if book.get('isbn'):
+        keys.append(book['isbn'])
+    return keys
+
+def unique_books(
+    books: Sequence[Optional[Dict[str, Any]]],
+    scores: Sequence[float],
+    seen: Optional[set] = None
+) -> List[Dict[str, Any]]:
+    """
+    One hydrated page of ranked results: drops missing rows and exact title+author /
+    ISBN repeats, including repeats of books on earlier pages recorded in `seen`
+    (which is updated). Returns book dicts with their relevance as 'score'.
+    """
+    seen = set() if seen is None else seen
+    results = []
+    for book, score in zip(books, scores):
+        if book is None:
+            continue
+        keys = _book_keys(book)
+        if any(key in seen for key in keys):
+            continue
+        seen.update(keys)
+        results.append({**book, "score": float(score)})
+    return results
@@ -0,0 +1,128 @@
+# search/suggest_index.py
+import bisect
+import logging
+import numpy as np
+from collections import Counter
+from typing import Any, Dict, List, Sequence
+from search.fuzzy_index import normalize_text, FIELD_TITLE, FIELD_AUTHOR
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+FIELD_GENRE = "genre"
+
+DEFAULT_SUGGESTIONS = 8
+MAX_SUGGESTIONS = 20
+# Prefixes this short match a large share of all keys; their top MAX_SUGGESTIONS
+# entries are computed at build time instead of per keystroke
+SHORT_PREFIX_CHARS = 2
+# Sorts after every character normalize_text() can produce
+_PREFIX_END = "\x7f"
+
+class PrefixIndex:
+    """
+    Typeahead over titles, authors and genres.
+    - Keys are normalized entries plus every word-suffix of them ("christie" finds
+      "Agatha Christie"), kept in one sorted list searched with bisect
+    - Entries are ranked once at build time by popularity (number of books sharing
+      the author, genre or title), then shorter text; a lookup takes the best
+      ranks in the matching key range
+    - Results for prefixes of up to SHORT_PREFIX_CHARS characters are precomputed
+    """
+
+    def __init__(self, rows: Sequence[Dict[str, Any]]):
+        counts: Counter = Counter()
+        display: Dict[tuple, str] = {}
+        for row in rows:
+            values = [(FIELD_TITLE, row.get('title')), (FIELD_AUTHOR, row.get('author'))]
+            values += [(FIELD_GENRE, genre) for genre in (row.get('genre') or "").split(",")]
+            for field, value in values:
+                normalized = normalize_text(value)
+                if normalized:
+                    key = (field, normalized)
+                    counts[key] += 1
+                    display.setdefault(key, value.strip())
+
+        entries = list(counts)
+        self.fields = [field for field, _ in entries]
+        self.texts = [display[entry] for entry in entries]
+        self.weights = np.array([counts[entry] for entry in entries], dtype=np.int32)
+
+        # rank 0 = most popular; ties go to the shorter completion
+        lengths = np.array([len(normalized) for _, normalized in entries], dtype=np.int32)
+        order = np.lexsort((lengths, -self.weights))
+        self.ranks = np.empty(len(entries), dtype=np.int32)
+        self.ranks[order] = np.arange(len(entries), dtype=np.int32)
+        self.by_rank = order
+
+        keyed = []
+        for entry, (_, normalized) in enumerate(entries):
+            words = normalized.split()
+            keyed.extend((" ".join(words[i:]), entry) for i in range(len(words)))
+        keyed.sort()
+        self.keys = [key for key, _ in keyed]
+        self.key_entries = np.array([entry for _, entry in keyed], dtype=np.int32)
+
+        self.short_prefixes: Dict[str, np.ndarray] = {}
+        for length in range(1, SHORT_PREFIX_CHARS + 1):
+            # Jump from one distinct prefix to the next through the sorted keys
+            i = 0
+            while i < len(self.keys):
+                prefix = self.keys[i][:length]
+                self.short_prefixes[prefix] = self._top_entries(prefix, MAX_SUGGESTIONS)
+                i = bisect.bisect_left(self.keys, prefix + _PREFIX_END, i)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def _describe(self, entries: np.ndarray) -> List[Dict[str, Any]]:
+        return [
+            {"text": self.texts[entry], "type": self.fields[entry], "weight": int(self.weights[entry])}
+            for entry in entries.tolist()
+        ]
+
+    def popular(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        The `limit` best-ranked titles/authors/genres, best first (no prefix).
+        """
+        return self._describe(self.by_rank[:max(0, limit)])
+
+    def _top_entries(self, prefix: str, limit: int) -> np.ndarray:
+        """
+        Best-ranked entries with a key starting with normalized `prefix`, best first.
+        """
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + _PREFIX_END, lo)
+        if lo == hi:
+            return self.key_entries[:0]
+
+        # An entry can match through several of its words; keep it once
+        entries = np.unique(self.key_entries[lo:hi])
+        ranks = self.ranks[entries]
+        if len(entries) > limit:
+            top = np.argpartition(ranks, limit - 1)[:limit]
+            entries, ranks = entries[top], ranks[top]
+        return entries[np.argsort(ranks)]
+
+    def suggest(self, prefix: str, limit: int = DEFAULT_SUGGESTIONS) -> List[Dict[str, Any]]:
+        """
+        Most popular titles/authors/genres with a word starting with `prefix`, best first.
+        """
+        prefix = normalize_text(prefix)
+        if not prefix or limit <= 0:
+            return []
+
+        if len(prefix) <= SHORT_PREFIX_CHARS and limit <= MAX_SUGGESTIONS:
+            entries = self.short_prefixes.get(prefix, self.key_entries[:0])[:limit]
+        else:
+            entries = self._top_entries(prefix, limit)
+        return self._describe(entries)
+
+def build_prefix_index() -> PrefixIndex:
+    """
+    Builds the typeahead index over every book's title, author and genres from the database.
+    """
+    from storage.db import get_lookup_rows
+    index = PrefixIndex(get_lookup_rows())
+    logger.info(f"Prefix index: {len(index)} suggestions, {len(index.keys)} keys.")
+    return index
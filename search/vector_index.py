@@ -0,0 +1,237 @@
+# search/vector_index.py
+import os
+import logging
+import numpy as np
+from typing import Dict, Any, Optional, Tuple
+from search.binary_index import hamming_shortlist, pack_sign_bits
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+STORAGE_FLOAT32 = 'float32'
+STORAGE_FLOAT16 = 'float16'
+STORAGE_INT8 = 'int8'
+STORAGE_TYPES = (STORAGE_FLOAT32, STORAGE_FLOAT16, STORAGE_INT8)
+
+# Quantized scans over-fetch this many candidates per result before rescoring
+RESCORE_MULTIPLIER = 4
+# Quantized rows are upcast through one reused float32 buffer this many rows deep.
+# Small enough to stay in cache (1024 x 384 x 4 B = 1.5 MB): an int8 scan then beats
+# float32 (less memory traffic); a large block is ~4x slower than float32.
+SCAN_BLOCK_ROWS = 1024
+
+# Binary pre-filter: Hamming scan over sign codes picks a shortlist for exact reranking.
+# 'auto' uses it only if the index passed its build-time recall check; 'on' / 'off' force it.
+BINARY_PREFILTER = os.environ.get("BINARY_PREFILTER", "auto").lower()
+# Below this a direct scan is already cheap (float32, 384 dims: ~12 ms at 100k rows)
+# and the shortlist loses too much of a deep candidate list
+BINARY_MIN_ROWS = 100000
+BINARY_SHORTLIST_MULTIPLIER = 32
+# Shortlist rows per requested result past the head (BINARY_CHECK_K)
+BINARY_DEEP_MULTIPLIER = 4
+BINARY_MIN_SHORTLIST = 1000
+# The shortlist grows with the catalog: Hamming neighbours get noisier as N grows
+BINARY_SHORTLIST_FRACTION = float(os.environ.get("BINARY_SHORTLIST_FRACTION", "0.05"))
+# Build-time gate: 'auto' disables the pre-filter below this recall@BINARY_CHECK_K.
+# The shortlist is sized for this head too, so deep requests (a paged /search asks for
+# RESULTS_DEPTH candidates) rescore the same shortlist the check measured.
+BINARY_MIN_RECALL = float(os.environ.get("BINARY_MIN_RECALL", "0.95"))
+BINARY_CHECK_K = 30
+
+def quantize_embeddings(embeddings: np.ndarray, storage: str) -> Dict[str, Any]:
+    """
+    Converts a float32 embedding matrix into a compact storage format.
+    - float16: plain half-precision cast
+    - int8: symmetric scalar quantization with one scale per dimension
+    Returns the fields to merge into the embeddings payload.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+
+    if storage == STORAGE_FLOAT16:
+        return {"storage": storage, "embeddings": embeddings.astype(np.float16)}
+
+    if storage == STORAGE_INT8:
+        max_abs = np.abs(embeddings).max(axis=0)
+        scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+        codes = np.clip(np.rint(embeddings / scales), -127, 127).astype(np.int8)
+        return {"storage": storage, "embeddings": codes, "scales": scales}
+
+    return {"storage": STORAGE_FLOAT32, "embeddings": embeddings}
+
+def _scan_scores(data: Dict[str, Any], query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Dot-product scores of the query against stored rows (all rows if `rows` is None).
+    For int8 the per-dimension scales are folded into the query once.
+    NumPy has no BLAS int8 kernel (an integer matmul is ~5x slower), so quantized
+    blocks are cast into a cache-resident float32 buffer and scored with sgemv.
+    float16 casts are slow in NumPy, so float16 is only scanned over a shortlist
+    (see search_vectors).
+    """
+    stored = data['embeddings']
+    if data.get('storage') == STORAGE_INT8:
+        query = query * data['scales']
+
+    if stored.dtype == np.float32:
+        return (stored if rows is None else stored[rows]) @ query
+
+    query = query.astype(np.float32)
+    n = stored.shape[0] if rows is None else len(rows)
+    scores = np.empty(n, dtype=np.float32)
+    buffer = np.empty((min(SCAN_BLOCK_ROWS, n), stored.shape[1]), dtype=np.float32)
+    for start in range(0, n, SCAN_BLOCK_ROWS):
+        end = min(start + SCAN_BLOCK_ROWS, n)
+        block = buffer[:end - start]
+        block[...] = stored[start:end] if rows is None else stored[rows[start:end]]
+        np.matmul(block, query, out=scores[start:end])
+    return scores
+
+def binary_shortlist_size(n: int, top_k: int) -> int:
+    """
+    Candidates kept by the Hamming pre-filter for a scan over n rows.
+    Sized for the first BINARY_CHECK_K results; results beyond them come from the same shortlist.
+    """
+    head = min(top_k, BINARY_CHECK_K)
+    return max(
+        head * BINARY_SHORTLIST_MULTIPLIER,
+        top_k * BINARY_DEEP_MULTIPLIER,
+        BINARY_MIN_SHORTLIST,
+        int(n * BINARY_SHORTLIST_FRACTION),
+    )
+
+def binary_prefilter_enabled(data: Dict[str, Any]) -> bool:
+    """
+    Whether searches over this payload use the Hamming pre-filter (see BINARY_PREFILTER).
+    Payloads saved without a recall check count as failing it.
+    """
+    if data.get('binary_codes') is None or BINARY_PREFILTER == "off":
+        return False
+    if BINARY_PREFILTER == "on":
+        return True
+    return bool(data.get('binary_prefilter', False))
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first.
+    Uses argpartition so only the selected slice is fully sorted.
+    """
+    if k >= len(scores):
+        return np.argsort(-scores, kind='stable')
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part], kind='stable')]
+
+def search_vectors(
+    data: Dict[str, Any],
+    query_vec: np.ndarray,
+    top_k: int,
+    candidate_indices: Optional[np.ndarray] = None,
+    use_binary: Optional[bool] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ranks stored embeddings against a normalized query vector.
+    Returns (row indices into data['ids'], scores), best first.
+    - Large scans are first narrowed by Hamming distance over binary sign codes
+      (use_binary=None follows binary_prefilter_enabled)
+    - float16 matrices are always narrowed this way when the pre-filter is on: they trade
+      scan speed for memory (a full float16 scan is several times slower than float32)
+    - Quantized matrices are scanned and the shortlist is rescored at full precision
+    """
+    query = np.asarray(query_vec, dtype=np.float32).reshape(-1)
+    if top_k <= 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+
+    codes = data.get('binary_codes')
+    if use_binary is None:
+        use_binary = binary_prefilter_enabled(data)
+    if use_binary and codes is not None:
+        n = codes.shape[0] if candidate_indices is None else len(candidate_indices)
+        shortlist_size = binary_shortlist_size(n, top_k)
+        min_rows = 0 if data.get('storage') == STORAGE_FLOAT16 else BINARY_MIN_ROWS
+        if n >= min_rows and shortlist_size < n:
+            candidate_indices = hamming_shortlist(codes, query, shortlist_size, candidate_indices)
+
+    full = data.get('full_embeddings')
+    quantized = data.get('storage', STORAGE_FLOAT32) != STORAGE_FLOAT32
+    fetch = top_k * RESCORE_MULTIPLIER if (quantized and full is not None) else top_k
+
+    scores = _scan_scores(data, query, candidate_indices)
+    local = top_k_indices(scores, fetch)
+    indices = local if candidate_indices is None else np.asarray(candidate_indices)[local]
+    scores = scores[local]
+
+    if fetch != top_k:
+        # Rescore the shortlist with exact float32 rows (sorted reads for the memmap)
+        shortlist = np.sort(indices)
+        exact = np.asarray(full[shortlist], dtype=np.float32) @ query
+        order = top_k_indices(exact, top_k)
+        indices, scores = shortlist[order], exact[order]
+
+    return indices, scores
+
+def candidate_vectors(data: Dict[str, Any], rows: np.ndarray) -> np.ndarray:
+    """
+    float32 embeddings of the given rows, for re-ranking a candidate set.
+    Uses the exact float32 copy when one exists, otherwise dequantizes.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if len(rows) == 0:
+        return np.empty((0, data['embeddings'].shape[1]), dtype=np.float32)
+
+    full = data.get('full_embeddings')
+    if full is not None:
+        # Sorted reads for the memmap, then back to candidate order
+        order = np.argsort(rows)
+        vectors = np.empty((len(rows), full.shape[1]), dtype=np.float32)
+        vectors[order] = full[rows[order]]
+        return vectors
+
+    stored = data['embeddings'][rows].astype(np.float32)
+    if data.get('storage') == STORAGE_INT8:
+        stored *= data['scales']
+    return stored
+
+def recall_report(
+    embeddings: np.ndarray,
+    storage: str,
+    k: int = 10,
+    sample: int = 200,
+    seed: int = 0,
+    binary: bool = False,
+    noise: float = 0.1
+) -> Dict[str, Any]:
+    """
+    Measures recall@k of quantized and/or binary pre-filtered search against exact float32 search.
+    Perturbed stored vectors are used as queries so no model is needed (an unperturbed
+    vector always finds itself, which flatters the pre-filter).
+    """
+    full = np.asarray(embeddings, dtype=np.float32)
+    if len(full) == 0:
+        return {}
+
+    quantized = quantize_embeddings(full, storage)
+    quantized['full_embeddings'] = full
+    if binary:
+        quantized['binary_codes'] = pack_sign_bits(full)
+    exact_data = {"storage": STORAGE_FLOAT32, "embeddings": full}
+
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(len(full), size=min(sample, len(full)), replace=False)
+    k = min(k, len(full))
+
+    hits = 0
+    for qi in queries:
+        # noise is the perturbation's expected norm relative to the unit query
+        query = full[qi] + (noise / np.sqrt(full.shape[1])) * rng.standard_normal(full.shape[1]).astype(np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        expected, _ = search_vectors(exact_data, query, k, use_binary=False)
+        found, _ = search_vectors(quantized, query, k, use_binary=binary)
+        hits += len(set(expected.tolist()) & set(found.tolist()))
+
+    return {
+        "storage": storage,
+        "binary_prefilter": binary,
+        "k": k,
+        "queries": len(queries),
+        f"recall@{k}": hits / (len(queries) * k),
+        "float32_mb": full.nbytes / 1e6,
+        "resident_mb": quantized['embeddings'].nbytes / 1e6,
+    }
@@ -0,0 +1,81 @@
+# storage/checkpoint.py
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from ingestion.config import CHECKPOINT_DIR
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_BYTES = 1 << 20
+
+def file_checksums(path: str, prefix_bytes: Optional[int] = None) -> Tuple[Optional[str], str]:
+    """
+    SHA-256 of the first `prefix_bytes` bytes and of the whole file, in one read.
+    The prefix digest is None when prefix_bytes is None or beyond the end of the file.
+    """
+    digest = hashlib.sha256()
+    prefix_digest = None
+    with open(path, 'rb') as f:
+        if prefix_bytes is not None:
+            remaining = prefix_bytes
+            while remaining > 0:
+                chunk = f.read(min(HASH_CHUNK_BYTES, remaining))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                remaining -= len(chunk)
+            if remaining == 0:
+                prefix_digest = digest.hexdigest()
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return prefix_digest, digest.hexdigest()
+
+def file_checksum(path: str) -> str:
+    return file_checksums(path)[1]
+
+class Checkpoint:
+    """
+    JSON progress marker for one pipeline stage.
+    State is only returned while the stage's input fingerprint is unchanged,
+    so a resumed run never skips work computed from different input.
+    """
+
+    def __init__(self, name: str, fingerprint: str, directory: str = CHECKPOINT_DIR):
+        self.name = name
+        self.fingerprint = fingerprint
+        self.directory = directory
+        self.path = os.path.join(directory, f"{name}.json")
+
+    def load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, 'r') as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {self.path}: {e}")
+            return {}
+
+        if saved.get("fingerprint") != self.fingerprint:
+            logger.info(f"Checkpoint '{self.name}' is for different input; starting fresh.")
+            return {}
+        logger.info(f"Resuming '{self.name}' from checkpoint saved at {saved.get('updated_at')}.")
+        return saved.get("state", {})
+
+    def save(self, state: Dict[str, Any]):
+        """
+        Written atomically so a crash mid-write leaves the previous checkpoint intact.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"fingerprint": self.fingerprint, "updated_at": datetime.now().isoformat(), "state": state}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,9 +1,13 @@
 # storage/db.py
 import sqlite3
 import os
+import time
+import struct
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from ingestion.config import DB_PATH
+from storage.cache import LRUCache
+from storage.version import get_catalog_versions
 
 
 
@@ -37,6 +41,16 @@ logger = logging.getLogger(__name__)
 # Schema path
 SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "schema.sql")
 
+# Hydration cache for get_books_by_ids (book id -> row dict)
+BOOK_CACHE_SIZE = 20000
+# How often (seconds) to check the pipeline's version stamp for invalidation
+BOOK_CACHE_VERSION_CHECK_INTERVAL = 1.0
+# Stay well under SQLite's bound-variable limit (999 on older builds)
+IDS_PER_QUERY = 500
+
+book_cache = LRUCache(BOOK_CACHE_SIZE)
+_book_cache_state = {"version": None, "checked_at": 0.0}
+
 def get_db_connection():
     """Establishes a connection to the SQLite database."""
     try:
@@ -75,15 +89,17 @@ def init_db():
 
 
 
-def insert_books(books: List[Dict[str, Any]]):
+def insert_books(books: List[Dict[str, Any]]) -> Optional[int]:
     """
     Bulk inserts valid books into the database.
     Uses INSERT OR IGNORE to skip duplicates based on UNIQUE(title, author).
     Applies strong normalization before deduplication and insertion.
+    Returns the number of newly inserted rows, or None if the batch could not be
+    written (callers must not checkpoint or advance watermarks past it).
     """
     if not books:
         logger.info("No books to insert.")
-        return
+        return 0
 
     # In-memory deduplication using normalized values
     seen = set()
@@ -116,11 +132,11 @@ def insert_books(books: List[Dict[str, Any]]):
 
     if not deduplicated_books:
         logger.info("No unique books to insert after deduplication.")
-        return
+        return 0
 
     conn = get_db_connection()
     if not conn:
-        return
+        return None
 
     query = """
     INSERT OR IGNORE INTO books 
@@ -156,13 +172,17 @@ def insert_books(books: List[Dict[str, Any]]):
 
         inserted = count_after - count_before
         skipped_db = len(data_to_insert) - inserted
+        book_cache.clear()
 
         logger.info(f"Successfully inserted {inserted} new book(s).")
         if skipped_db > 0:
             logger.info(f"Skipped {skipped_db} duplicate(s) already in database.")
 
+        return inserted
+
     except sqlite3.Error as e:
         logger.error(f"Error inserting books: {e}")
+        return None
     finally:
         conn.close()
 
@@ -258,6 +278,188 @@ def insert_books(books: List[Dict[str, Any]]):
 #     finally:
 #         conn.close()
 
+def get_books_after_id(last_id: int = 0, limit: int = 10000) -> List[Dict[str, Any]]:
+    """
+    Books with id > last_id in id order. Ids only grow, so this walks the
+    catalog in stable batches (used by incremental embedding).
+    """
+    conn = get_db_connection()
+    if not conn:
+        return []
+
+    query = """
+    SELECT id, isbn, title, description, author, genre, cover_image, publish_year, source, created_at 
+    FROM books 
+    WHERE id > ? 
+    ORDER BY id 
+    LIMIT ?
+    """
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, (last_id, limit))
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Error fetching books after id {last_id}: {e}")
+        return []
+    finally:
+        conn.close()
+
+def get_watermarks(source: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Ingestion watermarks for a source ('csv' or 'openlibrary'), keyed by source_key.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return {}
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT source_key, checksum, mtime, last_offset, fetched_at FROM ingestion_watermarks WHERE source = ?",
+            (source,)
+        )
+        return {row['source_key']: dict(row) for row in cursor.fetchall()}
+    except sqlite3.Error as e:
+        # Table missing on a DB created before watermarks: treat as never ingested
+        logger.warning(f"Could not read ingestion watermarks: {e}")
+        return {}
+    finally:
+        conn.close()
+
+def save_watermarks(watermarks: List[Dict[str, Any]]) -> bool:
+    """
+    Upserts ingestion watermarks. Called only after the data they cover is stored,
+    so a failed run never advances past unstored input.
+    """
+    if not watermarks:
+        return True
+
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    query = """
+    INSERT INTO ingestion_watermarks (source, source_key, checksum, mtime, last_offset, fetched_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(source, source_key) DO UPDATE SET
+        checksum = excluded.checksum,
+        mtime = excluded.mtime,
+        last_offset = excluded.last_offset,
+        fetched_at = excluded.fetched_at
+    """
+
+    try:
+        conn.executemany(query, [
+            (w['source'], w['source_key'], w.get('checksum'), w.get('mtime'), w.get('last_offset', 0), w.get('fetched_at'))
+            for w in watermarks
+        ])
+        conn.commit()
+        logger.info(f"Saved {len(watermarks)} ingestion watermark(s).")
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error saving ingestion watermarks: {e}")
+        return False
+    finally:
+        conn.close()
+
+def save_book_neighbors(rows: List[Tuple[int, bytes, bytes]], replace_all: bool = True) -> bool:
+    """
+    Writes (book_id, packed neighbour ids, packed scores) rows of the "more like this"
+    graph in one transaction, so readers never see a half-written graph.
+    replace_all=False upserts only the given rows and keeps the rest of the graph.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    try:
+        with conn:
+            if replace_all:
+                conn.execute("DELETE FROM book_neighbors")
+            conn.executemany("INSERT OR REPLACE INTO book_neighbors (book_id, neighbor_ids, scores) VALUES (?, ?, ?)", rows)
+        logger.info(f"Saved similar-book lists for {len(rows)} book(s).")
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error saving similar-book graph: {e}")
+        return False
+    finally:
+        conn.close()
+
+def count_book_neighbors() -> int:
+    """
+    Number of books with a precomputed similar-book list (0 if the table is missing).
+    """
+    conn = get_db_connection()
+    if not conn:
+        return 0
+
+    try:
+        return conn.execute("SELECT COUNT(*) FROM book_neighbors").fetchone()[0]
+    except sqlite3.Error:
+        return 0
+    finally:
+        conn.close()
+
+def get_all_book_neighbors() -> List[Tuple[int, bytes, bytes]]:
+    """
+    Every stored (book_id, packed neighbour ids, packed scores) row, for incremental updates.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return []
+
+    try:
+        rows = conn.execute("SELECT book_id, neighbor_ids, scores FROM book_neighbors").fetchall()
+        return [(row['book_id'], row['neighbor_ids'], row['scores']) for row in rows]
+    except sqlite3.Error as e:
+        logger.error(f"Error fetching similar-book graph: {e}")
+        return []
+    finally:
+        conn.close()
+
+def get_book_neighbors(book_id: int, limit: int = 10) -> List[Tuple[int, float]]:
+    """
+    Precomputed (neighbour id, similarity) pairs for a book, best first.
+    A single primary-key read; returns [] for unknown books or before the graph is built.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return []
+
+    try:
+        row = conn.execute("SELECT neighbor_ids, scores FROM book_neighbors WHERE book_id = ?", (book_id,)).fetchone()
+    except sqlite3.Error as e:
+        logger.error(f"Error fetching similar books for {book_id}: {e}")
+        return []
+    finally:
+        conn.close()
+
+    if not row:
+        return []
+    count = min(limit, len(row['neighbor_ids']) // 4)
+    ids = struct.unpack_from(f"<{count}i", row['neighbor_ids'])
+    scores = struct.unpack_from(f"<{count}e", row['scores'])
+    return list(zip(ids, scores))
+
+def get_lookup_rows() -> List[Dict[str, Any]]:
+    """
+    (id, title, author, genre) of every book, for building in-memory lookup indexes.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return []
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, title, author, genre FROM books ORDER BY id")
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Error fetching titles and authors: {e}")
+        return []
+    finally:
+        conn.close()
+
 def get_recent_books(limit: int = 100) -> List[Dict[str, Any]]:
     """
     Fetches the most recent books from the database.
@@ -284,6 +486,72 @@ def get_recent_books(limit: int = 100) -> List[Dict[str, Any]]:
     finally:
         conn.close()
 
+def get_books_page(
+    limit: int = 20,
+    after: Optional[Tuple[str, int]] = None,
+    genre: Optional[str] = None,
+    author: Optional[str] = None,
+    source: Optional[str] = None,
+    publish_year: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, int]]]:
+    """
+    Keyset-paginated listing, newest first, ordered by (created_at, id).
+    - after: the (created_at, id) key of the last row of the previous page
+    - author/source/publish_year are equality filters backed by composite indexes
+    - genre is a case-insensitive substring match (filtered while walking the index)
+    Returns (books, key of the last row or None when there are no more pages).
+    """
+    conn = get_db_connection()
+    if not conn:
+        return [], None
+
+    conditions = []
+    params: List[Any] = []
+
+    if author:
+        # Authors are stored normalized (see insert_books)
+        conditions.append("author = ?")
+        params.append(normalize(author))
+    if source:
+        conditions.append("source = ?")
+        params.append(source)
+    if publish_year:
+        conditions.append("publish_year = ?")
+        params.append(publish_year)
+    if genre:
+        conditions.append("genre LIKE ?")
+        params.append(f"%{genre}%")
+    if after:
+        # Row-value comparison lets SQLite seek straight to the cursor in the index
+        conditions.append("(created_at, id) < (?, ?)")
+        params.extend(after)
+
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = f"""
+    SELECT id, isbn, title, description, author, genre, cover_image, publish_year, source, created_at 
+    FROM books 
+    {where_clause}
+    ORDER BY created_at DESC, id DESC 
+    LIMIT ?
+    """
+    # One extra row tells us whether another page exists
+    params.append(limit + 1)
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        rows = [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Error fetching books page: {e}")
+        return [], None
+    finally:
+        conn.close()
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, (rows[-1]['created_at'], rows[-1]['id'])
+
 def search_books(query_text: str, limit: int = 100) -> List[Dict[str, Any]]:
     """
     Searches books by title, author, description, or genre.
@@ -315,37 +583,74 @@ def search_books(query_text: str, limit: int = 100) -> List[Dict[str, Any]]:
     finally:
         conn.close()
 
-def get_books_by_ids(ids: List[int]) -> List[Dict[str, Any]]:
+def _sync_book_cache():
     """
-    Fetches books by a list of IDs.
+    Clears the hydration cache when a pipeline run has written a new DB version stamp.
+    The stamp file is read at most once per BOOK_CACHE_VERSION_CHECK_INTERVAL.
     """
-    if not ids:
-        return []
-    
-    conn = get_db_connection()
-    if not conn:
-        return []
-    
-    placeholders = ', '.join('?' for _ in ids)
-    sql = f"""
-    SELECT id, isbn, title, description, author, genre, cover_image, publish_year, source, created_at 
-    FROM books 
-    WHERE id IN ({placeholders})
+    now = time.monotonic()
+    if now - _book_cache_state["checked_at"] < BOOK_CACHE_VERSION_CHECK_INTERVAL:
+        return
+    _book_cache_state["checked_at"] = now
+
+    version = get_catalog_versions()["db"]
+    if version != _book_cache_state["version"]:
+        if _book_cache_state["version"] is not None:
+            logger.info("Catalog changed; clearing book cache.")
+        book_cache.clear()
+        _book_cache_state["version"] = version
+
+def get_books_by_ids(ids: List[int], aligned: bool = False) -> List[Optional[Dict[str, Any]]]:
     """
-    
-    # Preserve order of IDs if possible, but SQL IN doesn't guarantee it.
-    # Application layer can re-sort.
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute(sql, tuple(ids))
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
-    except sqlite3.Error as e:
-        logger.error(f"Error fetching books by IDs: {e}")
+    Fetches books by a list of IDs, returned in the requested order.
+    - Hot books are served from a bounded LRU cache
+    - Misses are fetched in chunks to stay under SQLite's variable limit
+    - aligned=True returns one entry per id, with None for ids not in the DB
+    """
+    if not ids:
         return []
-    finally:
-        conn.close()
+
+    _sync_book_cache()
+
+    found: Dict[int, Dict[str, Any]] = {}
+    missing = []
+    for book_id in dict.fromkeys(ids):
+        book = book_cache.get(book_id)
+        if book is None:
+            missing.append(book_id)
+        else:
+            found[book_id] = book
+
+    if missing:
+        conn = get_db_connection()
+        if not conn:
+            return []
+
+        try:
+            cursor = conn.cursor()
+            for start in range(0, len(missing), IDS_PER_QUERY):
+                chunk = missing[start:start + IDS_PER_QUERY]
+                placeholders = ', '.join('?' for _ in chunk)
+                sql = f"""
+                SELECT id, isbn, title, description, author, genre, cover_image, publish_year, source, created_at 
+                FROM books 
+                WHERE id IN ({placeholders})
+                """
+                cursor.execute(sql, tuple(chunk))
+                for row in cursor.fetchall():
+                    book = dict(row)
+                    found[book['id']] = book
+                    book_cache.put(book['id'], book)
+        except sqlite3.Error as e:
+            logger.error(f"Error fetching books by IDs: {e}")
+            return []
+        finally:
+            conn.close()
+
+    # Copies so callers can't mutate cached rows
+    if aligned:
+        return [dict(found[i]) if i in found else None for i in ids]
+    return [dict(found[i]) for i in ids if i in found]
 
 def get_database_stats() -> Dict[str, int]:
     """
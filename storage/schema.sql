@@ -11,3 +11,32 @@ CREATE TABLE IF NOT EXISTS books (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE(title, author) ON CONFLICT IGNORE
 );
+
+-- Keyset pagination on (created_at, id), newest first
+CREATE INDEX IF NOT EXISTS idx_books_created_id ON books (created_at, id);
+
+-- Filtered listings: equality column first, then the pagination key
+CREATE INDEX IF NOT EXISTS idx_books_source_created ON books (source, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_books_author_created ON books (author, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_books_year_created ON books (publish_year, created_at, id);
+
+-- Incremental ingestion: how far each input has been consumed.
+-- csv: source_key = file path, checksum/mtime/last_offset (bytes) of the last stored version
+-- openlibrary: source_key = subject, last_offset = docs fetched so far
+CREATE TABLE IF NOT EXISTS ingestion_watermarks (
+    source TEXT NOT NULL,
+    source_key TEXT NOT NULL,
+    checksum TEXT,
+    mtime REAL,
+    last_offset INTEGER NOT NULL DEFAULT 0,
+    fetched_at TIMESTAMP,
+    PRIMARY KEY (source, source_key)
+);
+
+-- Precomputed "more like this" graph: one row per book, neighbours best first.
+-- neighbor_ids: little-endian int32 book ids, scores: float16 cosine similarities
+CREATE TABLE IF NOT EXISTS book_neighbors (
+    book_id INTEGER PRIMARY KEY,
+    neighbor_ids BLOB NOT NULL,
+    scores BLOB NOT NULL
+);
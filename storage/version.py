@@ -0,0 +1,112 @@
+# storage/version.py
+import os
+import json
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+from ingestion.config import CATALOG_VERSION_FILE
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Components that get their own stamp: 'db' (book rows) and 'index' (embeddings)
+VERSION_COMPONENTS = ("db", "index")
+
+def get_catalog_versions() -> Dict[str, str]:
+    """
+    Returns the current version stamp of each catalog component.
+    Missing or unreadable stamps read as "0".
+    """
+    versions = {component: "0" for component in VERSION_COMPONENTS}
+    try:
+        with open(CATALOG_VERSION_FILE, 'r') as f:
+            versions.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read catalog version file: {e}")
+    return versions
+
+def get_catalog_version() -> str:
+    """
+    Single cache-busting key covering every component.
+    """
+    versions = get_catalog_versions()
+    return "-".join(versions[component] for component in VERSION_COMPONENTS)
+
+_current_version = {"value": None, "checked_at": 0.0}
+
+def current_catalog_version(max_age: float = 1.0) -> str:
+    """
+    Same as get_catalog_version(), but re-reads the stamp file at most once
+    every `max_age` seconds. Use on hot paths (per-request cache keys).
+    """
+    now = time.monotonic()
+    if _current_version["value"] is None or now - _current_version["checked_at"] >= max_age:
+        _current_version["value"] = get_catalog_version()
+        _current_version["checked_at"] = now
+    return _current_version["value"]
+
+def bump_catalog_version(component: str) -> str:
+    """
+    Marks a catalog component as changed. Called by run_pipeline.py after a stage writes data.
+    The file is replaced atomically so readers never see a partial write.
+    """
+    versions = get_catalog_versions()
+    versions[component] = str(time.time_ns())
+
+    os.makedirs(os.path.dirname(CATALOG_VERSION_FILE), exist_ok=True)
+    tmp_path = f"{CATALOG_VERSION_FILE}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(versions, f)
+    os.replace(tmp_path, CATALOG_VERSION_FILE)
+
+    logger.info(f"Catalog version bumped: {component}={versions[component]}")
+    return versions[component]
+
+class VersionedResource:
+    """
+    An in-memory structure derived from the catalog (e.g. a lookup index),
+    rebuilt when the catalog version changes.
+    - The first get() builds inline (get(wait=False) builds in the background and
+      returns None until done); later rebuilds run in a background thread while
+      the previous build keeps serving
+    - A failed build keeps the previous value and is retried on the next version check
+    """
+
+    def __init__(self, name: str, builder: Callable[[], Any]):
+        self.name = name
+        self.builder = builder
+        self.value: Optional[Any] = None
+        self.version: Optional[str] = None
+        self._lock = threading.Lock()
+        self._building = False
+
+    def _build(self, version: str):
+        start = time.perf_counter()
+        try:
+            value = self.builder()
+            self.value, self.version = value, version
+            logger.info(f"Built {self.name} for catalog version {version} in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            logger.error(f"Failed to build {self.name}: {e}")
+        finally:
+            with self._lock:
+                self._building = False
+
+    def get(self, wait: bool = True) -> Optional[Any]:
+        version = current_catalog_version()
+        if version == self.version:
+            return self.value
+
+        with self._lock:
+            if self._building:
+                return self.value
+            self._building = True
+
+        if self.value is None and wait:
+            self._build(version)
+        else:
+            threading.Thread(target=self._build, args=(version,), name=f"rebuild-{self.name}", daemon=True).start()
+        return self.value
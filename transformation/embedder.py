@@ -1,23 +1,46 @@
 # transformation/embedder.py
 import pickle
 import os
+import time
 import logging
 import numpy as np
 from typing import List, Dict, Any
-from sentence_transformers import SentenceTransformer
 from ingestion.config import DATA_DIR
+from search.vector_index import quantize_embeddings, STORAGE_FLOAT32
+from search.binary_index import pack_sign_bits
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 EMBEDDINGS_FILE = os.path.join(DATA_DIR, "embeddings.pkl")
+# Full-precision copy used (memory-mapped) to rescore quantized search results
+EMBEDDINGS_FULL_FILE = os.path.join(DATA_DIR, "embeddings_f32.npy")
 # Use a small, fast model suitable for local pipelines
 MODEL_NAME = 'all-MiniLM-L6-v2'
+# Query/pipeline encoder backend: 'torch' (sentence-transformers) or 'onnx' (onnxruntime)
+ENCODER_BACKEND = os.environ.get("ENCODER_BACKEND", "torch")
 
-def load_model():
+# Encoding throughput knobs (overridable from run_pipeline.py)
+EMBEDDING_BATCH_SIZE = 64
+EMBEDDING_WORKERS = 1  # > 1 spreads encoding over a multi-process CPU pool
+# In-memory matrix format: 'float32', 'float16' or 'int8'
+EMBEDDING_STORAGE = STORAGE_FLOAT32
+
+def load_model(backend: str = ENCODER_BACKEND):
     """
-    Loads the sentence transformer model.
+    Loads the sentence encoder for the configured backend.
+    All backends expose the same encode() signature.
+    - 'stub' is a model-free hashing encoder for benchmarks and load tests
     """
+    if backend == "stub":
+        from transformation.stub_encoder import HashingEncoder
+        return HashingEncoder()
+
+    if backend == "onnx":
+        from transformation.onnx_encoder import load_onnx_encoder
+        return load_onnx_encoder()
+
+    from sentence_transformers import SentenceTransformer
     logger.info(f"Loading embedding model: {MODEL_NAME}...")
     return SentenceTransformer(MODEL_NAME)
 
@@ -33,19 +56,78 @@ def generate_text_for_embedding(book: Dict[str, Any]) -> str:
     # Structured combination: Clearer signals for the model
     return f"Title: {title}. Author: {author}. Genres: {genre}. Description: {description}."
 
-def generate_embeddings(books: List[Dict[str, Any]], model) -> Dict[str, Any]:
+def _encode_multi_process(model, texts: List[str], batch_size: int, workers: int) -> np.ndarray:
+    """
+    Encodes texts on a pool of CPU worker processes.
+    Each worker gets an equal share of the cores so torch threads don't oversubscribe.
+    """
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    previous = os.environ.get('OMP_NUM_THREADS')
+    os.environ['OMP_NUM_THREADS'] = str(threads_per_worker)
+    try:
+        pool = model.start_multi_process_pool(target_devices=['cpu'] * workers)
+    finally:
+        if previous is None:
+            os.environ.pop('OMP_NUM_THREADS', None)
+        else:
+            os.environ['OMP_NUM_THREADS'] = previous
+
+    try:
+        # Contiguous chunks of the length-sorted list keep each worker's batches uniform
+        chunk_size = max(batch_size, min(5000, len(texts) // (workers * 4) or batch_size))
+        return model.encode_multi_process(
+            texts,
+            pool,
+            batch_size=batch_size,
+            chunk_size=chunk_size,
+            normalize_embeddings=True
+        )
+    finally:
+        model.stop_multi_process_pool(pool)
+
+def generate_embeddings(
+    books: List[Dict[str, Any]],
+    model,
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    workers: int = EMBEDDING_WORKERS
+) -> Dict[str, Any]:
     """
     Generates embeddings for a list of books.
     Returns a dictionary containing IDs and the embedding matrix.
+    - Texts are sorted by length so batches hold similar-sized inputs (less padding)
+    - workers > 1 encodes on a multi-process CPU pool
     """
     if not books:
         return {}
 
-    logger.info(f"Generating embeddings for {len(books)} books...")
+    workers = max(1, workers or 1)
+    logger.info(f"Generating embeddings for {len(books)} books (batch_size={batch_size}, workers={workers})...")
     
     texts = [generate_text_for_embedding(b) for b in books]
-    # Normalize embeddings for cosine similarity via dot product
-    embeddings = model.encode(texts, show_progress_bar=True, normalize_embeddings=True)
+
+    # Length-sorted bucketing: longest first so the slowest batches start early
+    order = np.argsort([-len(t) for t in texts], kind='stable')
+    sorted_texts = [texts[i] for i in order]
+
+    start = time.perf_counter()
+    if workers > 1 and len(texts) > batch_size and hasattr(model, 'start_multi_process_pool'):
+        sorted_embeddings = _encode_multi_process(model, sorted_texts, batch_size, workers)
+    else:
+        # Normalize embeddings for cosine similarity via dot product
+        sorted_embeddings = model.encode(
+            sorted_texts,
+            batch_size=batch_size,
+            show_progress_bar=True,
+            normalize_embeddings=True
+        )
+    elapsed = time.perf_counter() - start
+
+    # Restore original book order
+    embeddings = np.empty_like(sorted_embeddings)
+    embeddings[order] = sorted_embeddings
+
+    rate = len(texts) / elapsed if elapsed > 0 else float('inf')
+    logger.info(f"Encoded {len(texts)} texts in {elapsed:.1f}s ({rate:.1f} texts/sec)")
     
     # Store ID mapping to link back to DB
     ids = [book['id'] for book in books]
@@ -55,21 +137,60 @@ def generate_embeddings(books: List[Dict[str, Any]], model) -> Dict[str, Any]:
         "embeddings": embeddings
     }
 
-def save_embeddings(data: Dict[str, Any]):
+def _replace_file(path: str, write):
+    """
+    Writes via write(file) to a temp file next to `path`, then atomically renames it over `path`.
+    Readers that already opened (or mapped) the old file keep their copy.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def save_embeddings(data: Dict[str, Any], storage: str = EMBEDDING_STORAGE):
     """
     Saves embeddings to a pickle file.
+    Quantized storage keeps the compact matrix in the pickle and writes the
+    float32 matrix to a separate .npy file for full-precision rescoring.
+    Binary sign codes for the Hamming pre-filter are always included, with the
+    build-time recall check result (binary_prefilter / binary_recall) if present.
+    Both files are written to a temp file and renamed into place: serving processes
+    memory-map the .npy, and rewriting it in place would crash them (SIGBUS).
     """
-    with open(EMBEDDINGS_FILE, 'wb') as f:
-        pickle.dump(data, f)
-    logger.info(f"Embeddings saved to {EMBEDDINGS_FILE}")
+    if data:
+        full = np.asarray(data['embeddings'], dtype=np.float32)
+        data = {**data, "binary_codes": pack_sign_bits(full)}
+
+        if storage != STORAGE_FLOAT32:
+            _replace_file(EMBEDDINGS_FULL_FILE, lambda f: np.save(f, full))
+            flags = {key: data[key] for key in ("binary_prefilter", "binary_recall") if key in data}
+            data = {"ids": data['ids'], "binary_codes": data['binary_codes'], **flags, **quantize_embeddings(full, storage)}
+            logger.info(f"Full-precision embeddings saved to {EMBEDDINGS_FULL_FILE}")
+
+    _replace_file(EMBEDDINGS_FILE, lambda f: pickle.dump(data, f))
+    logger.info(f"Embeddings saved to {EMBEDDINGS_FILE} (storage={data.get('storage', STORAGE_FLOAT32) if data else storage})")
 
 def load_embeddings() -> Dict[str, Any]:
     """
     Loads embeddings from the pickle file.
+    For quantized payloads the float32 matrix is memory-mapped, not read into RAM.
     """
     if not os.path.exists(EMBEDDINGS_FILE):
         logger.warning(f"Embeddings file {EMBEDDINGS_FILE} not found.")
         return {}
         
     with open(EMBEDDINGS_FILE, 'rb') as f:
-        return pickle.load(f)
+        data = pickle.load(f)
+
+    if data and data.get('storage', STORAGE_FLOAT32) != STORAGE_FLOAT32:
+        if os.path.exists(EMBEDDINGS_FULL_FILE):
+            data['full_embeddings'] = np.load(EMBEDDINGS_FULL_FILE, mmap_mode='r')
+        else:
+            logger.warning(f"{EMBEDDINGS_FULL_FILE} not found; quantized search will not be rescored.")
+
+    return data
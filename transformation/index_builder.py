@@ -0,0 +1,188 @@
+# transformation/index_builder.py
+import os
+import json
+import time
+import logging
+import numpy as np
+from typing import Any, Dict, List
+from ingestion.config import CHECKPOINT_DIR
+from search.knn_graph import compute_knn_graph, update_knn_graph, pack_knn_graph, unpack_knn_graph
+from search.vector_index import (
+    recall_report, STORAGE_FLOAT32, STORAGE_FLOAT16, BINARY_CHECK_K, BINARY_MIN_RECALL
+)
+from storage.checkpoint import Checkpoint
+from storage.db import get_books_after_id, save_book_neighbors, count_book_neighbors, get_all_book_neighbors
+from storage.version import bump_catalog_version
+from transformation.embedder import (
+    load_model, generate_embeddings, save_embeddings, load_embeddings, MODEL_NAME,
+    EMBEDDING_BATCH_SIZE, EMBEDDING_WORKERS, EMBEDDING_STORAGE
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Books per encoded (and checkpointed) chunk
+EMBEDDING_CHECKPOINT_ROWS = 10000
+EMBEDDING_CHUNK_DIR = os.path.join(CHECKPOINT_DIR, "embedding_chunks")
+
+class IncrementalIndexBuilder:
+    """
+    Extends the embedding index with books stored since it was last saved.
+    - Ids only grow, so books above the index's last id are exactly the unembedded ones
+    - Each encoded chunk is checkpointed; an interrupted build reuses chunks that
+      start from the same point with the same model
+    - full_refresh=True ignores the existing index and embeds every book
+    """
+
+    def __init__(
+        self,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        workers: int = EMBEDDING_WORKERS,
+        storage: str = EMBEDDING_STORAGE,
+        full_refresh: bool = False,
+        chunk_rows: int = EMBEDDING_CHECKPOINT_ROWS
+    ):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.storage = storage
+        self.chunk_rows = chunk_rows
+        self.model = None
+
+        self.ids, self.matrix, self.stored_as = self._load_existing(full_refresh)
+        self.cursor = max(self.ids) if self.ids else 0
+
+        self.checkpoint = Checkpoint("embedding", f"{MODEL_NAME}:{self.cursor}")
+        self.chunks: Dict[str, str] = self.checkpoint.load().get("chunks", {})
+        self.new_ids: List[int] = []
+        self.new_blocks: List[np.ndarray] = []
+
+    @staticmethod
+    def _load_existing(full_refresh: bool):
+        """
+        Ids, float32 matrix and storage format of the current index.
+        Returns ([], None, None) when everything has to be embedded.
+        """
+        if full_refresh:
+            return [], None, None
+        data = load_embeddings()
+        if not data or not data.get('ids'):
+            return [], None, None
+
+        stored_as = data.get('storage', STORAGE_FLOAT32)
+        matrix = data['embeddings'] if stored_as == STORAGE_FLOAT32 else data.get('full_embeddings')
+        if matrix is None:
+            logger.warning("Quantized index has no float32 copy; re-embedding everything.")
+            return [], None, None
+        return list(data['ids']), matrix, stored_as
+
+    def load_model(self):
+        if self.model is None:
+            self.model = load_model()
+        return self.model
+
+    def embed_pending(self, final: bool = True) -> int:
+        """
+        Encodes stored books the builder hasn't seen yet. Returns how many were added.
+        - final=False only encodes full chunks (streaming runs call this as rows arrive,
+          and full chunks keep checkpoint keys stable across restarts)
+        """
+        added = 0
+        while True:
+            books = get_books_after_id(self.cursor, self.chunk_rows)
+            if not books or (not final and len(books) < self.chunk_rows):
+                break
+
+            key = f"{books[0]['id']}-{books[-1]['id']}"
+            path = self.chunks.get(key)
+            if path and os.path.exists(path):
+                logger.info(f"Reusing checkpointed embeddings for ids {key}.")
+                block = np.load(path)
+            else:
+                block = generate_embeddings(books, self.load_model(), batch_size=self.batch_size, workers=self.workers)['embeddings']
+                os.makedirs(EMBEDDING_CHUNK_DIR, exist_ok=True)
+                path = os.path.join(EMBEDDING_CHUNK_DIR, f"{key}.npy")
+                np.save(path, block)
+                self.chunks[key] = path
+                self.checkpoint.save({"chunks": self.chunks})
+
+            self.new_ids.extend(book['id'] for book in books)
+            self.new_blocks.append(block)
+            self.cursor = books[-1]['id']
+            added += len(books)
+        return added
+
+    @staticmethod
+    def build_similar_books(ids: List[int], matrix: np.ndarray, known: int = 0) -> int:
+        """
+        Precomputes every book's nearest neighbours and stores them for /books/{id}/similar.
+        - The first `known` rows already have stored lists: only the rows after them are
+          searched in full, and they are merged into the existing lists they displace
+        - Falls back to a full rebuild if the stored graph does not match those rows
+        Returns the number of lists written.
+        """
+        start = time.perf_counter()
+        stored = unpack_knn_graph(ids[:known], get_all_book_neighbors()) if known else None
+        if stored is None:
+            neighbor_rows, neighbor_scores = compute_knn_graph(matrix)
+            save_book_neighbors(pack_knn_graph(ids, neighbor_rows, neighbor_scores))
+            logger.info(f"Built similar-book graph for {len(ids)} book(s) in {time.perf_counter() - start:.1f}s.")
+            return len(ids)
+
+        neighbor_rows, neighbor_scores, changed = update_knn_graph(matrix, *stored)
+        changed = np.flatnonzero(changed)
+        save_book_neighbors(
+            pack_knn_graph(ids, neighbor_rows[changed], neighbor_scores[changed], rows=changed), replace_all=False
+        )
+        logger.info(
+            f"Updated similar-book graph with {len(ids) - known} new book(s) "
+            f"({len(changed)} list(s) written) in {time.perf_counter() - start:.1f}s."
+        )
+        return len(changed)
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Encodes any remaining books, then writes the merged index and similar-book graph
+        and bumps the index version. Returns record counts for the run report.
+        """
+        self.embed_pending(final=True)
+
+        if not self.new_ids and self.stored_as == self.storage:
+            logger.info("Index already covers every book; nothing to embed.")
+            if self.ids and count_book_neighbors() == 0:
+                logger.info("Similar-book graph missing; building it from the current index.")
+                self.build_similar_books(self.ids, self.matrix)
+            return {"records_in": 0, "records_out": len(self.ids)}
+        if not self.new_ids and not self.ids:
+            logger.warning("No books found in DB to embed.")
+            return {"records_in": 0, "records_out": 0}
+
+        # vstack copies, so the memory-mapped float32 file can be safely rewritten below
+        blocks = ([self.matrix] if self.matrix is not None else []) + self.new_blocks
+        data = {"ids": self.ids + self.new_ids, "embeddings": np.vstack(blocks)}
+        logger.info(f"Embedded {len(self.new_ids)} new book(s); index now holds {len(data['ids'])}.")
+
+        if self.storage != STORAGE_FLOAT32:
+            report = recall_report(data['embeddings'], self.storage)
+            logger.info(f"Quantization report vs float32: {json.dumps(report)}")
+        report = recall_report(data['embeddings'], self.storage, k=BINARY_CHECK_K, binary=True)
+        logger.info(f"Binary pre-filter report vs float32: {json.dumps(report)}")
+        # Searches only use the pre-filter by default if it keeps enough true neighbours
+        data['binary_recall'] = report.get(f"recall@{report.get('k')}", 1.0)
+        data['binary_prefilter'] = data['binary_recall'] >= BINARY_MIN_RECALL
+        if not data['binary_prefilter']:
+            logger.warning(
+                f"Binary pre-filter recall {data['binary_recall']:.3f} is below {BINARY_MIN_RECALL}; "
+                f"searches will scan every row (set BINARY_PREFILTER=on to force it)."
+            )
+            if self.storage == STORAGE_FLOAT16:
+                logger.warning("float16 storage without the pre-filter scans several times slower than float32.")
+
+        save_embeddings(data, storage=self.storage)
+        self.build_similar_books(data['ids'], data['embeddings'], known=len(self.ids))
+        bump_catalog_version("index")
+
+        for path in self.chunks.values():
+            if os.path.exists(path):
+                os.remove(path)
+        self.checkpoint.clear()
+        return {"records_in": len(self.new_ids), "records_out": len(data['ids'])}
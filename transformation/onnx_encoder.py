@@ -0,0 +1,166 @@
+# transformation/onnx_encoder.py
+import os
+import logging
+import numpy as np
+from typing import List, Dict, Any, Optional, Union
+from ingestion.config import DATA_DIR
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+ONNX_DIR = os.path.join(DATA_DIR, "models", "onnx")
+ONNX_MODEL_FILE = os.path.join(ONNX_DIR, "model.onnx")
+ONNX_QUANTIZED_FILE = os.path.join(ONNX_DIR, "model.int8.onnx")
+
+# Use the dynamically int8-quantized graph when it has been exported
+ONNX_QUANTIZE = os.environ.get("ONNX_QUANTIZE", "1") == "1"
+# Intra-op threads per session; small models stop scaling after a few cores
+ONNX_THREADS = int(os.environ.get("ONNX_THREADS", min(4, os.cpu_count() or 1)))
+MAX_SEQ_LENGTH = 256
+
+# Minimum cosine between ONNX and PyTorch vectors for the export to be accepted
+VERIFY_TOLERANCE = {False: 0.9999, True: 0.99}
+VERIFY_TEXTS = [
+    "Title: Dune. Author: Frank Herbert. Genres: science fiction. Description: A desert planet and a prophecy.",
+    "a psychological thriller about memory loss",
+    "Victorian London mystery with a detective",
+    "cozy fantasy romance",
+    "programming",
+]
+
+class OnnxEncoder:
+    """
+    Sentence encoder backed by onnxruntime.
+    Mirrors SentenceTransformer.encode (mean pooling + optional normalization)
+    so it can be used wherever load_model() is.
+    """
+
+    def __init__(self, model_path: str, tokenizer_dir: str = ONNX_DIR, threads: int = ONNX_THREADS):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_dir)
+        self.model_path = model_path
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        normalize_embeddings: bool = False,
+        **kwargs
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        outputs = []
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start:start + batch_size]
+            encoded = self.tokenizer(
+                batch, padding=True, truncation=True, max_length=MAX_SEQ_LENGTH, return_tensors='np'
+            )
+            feed = {name: encoded[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(None, feed)[0]
+
+            # Mean pooling over real (non-padding) tokens
+            mask = encoded['attention_mask'][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            outputs.append(pooled.astype(np.float32))
+
+        embeddings = np.vstack(outputs) if outputs else np.zeros((0, 0), dtype=np.float32)
+        if normalize_embeddings and len(embeddings):
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+
+        return embeddings[0] if single else embeddings
+
+def export_onnx_model(model=None, quantize: bool = ONNX_QUANTIZE):
+    """
+    Exports the sentence-transformers backbone to ONNX (one-time, needs torch).
+    Optionally writes a dynamically int8-quantized copy next to it.
+    """
+    import torch
+    from transformation.embedder import MODEL_NAME
+
+    if model is None:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(MODEL_NAME, device='cpu')
+
+    class _Backbone(torch.nn.Module):
+        def __init__(self, transformer):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.transformer(
+                input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids
+            )[0]
+
+    os.makedirs(ONNX_DIR, exist_ok=True)
+    backbone = _Backbone(model[0].auto_model).eval()
+    sample = model.tokenizer(["export sample"], return_tensors='pt')
+    input_names = ['input_ids', 'attention_mask', 'token_type_ids']
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names + ['last_hidden_state']}
+
+    logger.info(f"Exporting {MODEL_NAME} to {ONNX_MODEL_FILE}...")
+    with torch.no_grad():
+        torch.onnx.export(
+            backbone,
+            tuple(sample[name] for name in input_names),
+            ONNX_MODEL_FILE,
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+    model.tokenizer.save_pretrained(ONNX_DIR)
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(ONNX_MODEL_FILE, ONNX_QUANTIZED_FILE, weight_type=QuantType.QInt8)
+        logger.info(f"Quantized ONNX model saved to {ONNX_QUANTIZED_FILE}")
+
+    return model
+
+def load_onnx_encoder(quantize: bool = ONNX_QUANTIZE) -> OnnxEncoder:
+    """
+    Loads the ONNX encoder, exporting it first if no exported model exists.
+    """
+    if not os.path.exists(ONNX_MODEL_FILE) or (quantize and not os.path.exists(ONNX_QUANTIZED_FILE)):
+        export_onnx_model(quantize=quantize)
+
+    model_path = ONNX_QUANTIZED_FILE if quantize else ONNX_MODEL_FILE
+    logger.info(f"Loading ONNX encoder: {model_path} (threads={ONNX_THREADS})...")
+    return OnnxEncoder(model_path)
+
+def verify_onnx_encoder(reference_model=None, quantize: bool = ONNX_QUANTIZE, texts: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Compares ONNX vectors against the PyTorch model on sample texts.
+    Passes when every pair's cosine similarity is within the backend's tolerance.
+    """
+    from transformation.embedder import MODEL_NAME
+
+    if reference_model is None:
+        from sentence_transformers import SentenceTransformer
+        reference_model = SentenceTransformer(MODEL_NAME, device='cpu')
+
+    texts = texts or VERIFY_TEXTS
+    expected = reference_model.encode(texts, normalize_embeddings=True)
+    actual = load_onnx_encoder(quantize=quantize).encode(texts, normalize_embeddings=True)
+
+    cosines = np.sum(expected * actual, axis=1)
+    report = {
+        "quantized": quantize,
+        "min_cosine": float(cosines.min()),
+        "max_abs_diff": float(np.abs(expected - actual).max()),
+        "tolerance": VERIFY_TOLERANCE[quantize],
+    }
+    report["passed"] = report["min_cosine"] >= report["tolerance"]
+    return report
@@ -0,0 +1,49 @@
+# transformation/stub_encoder.py
+import re
+import zlib
+import numpy as np
+from typing import Dict, List, Union
+
+STUB_DIMS = 384
+
+class HashingEncoder:
+    """
+    Deterministic, model-free stand-in for SentenceTransformer.encode.
+    Each token maps to a fixed pseudo-random vector (seeded by its CRC32) and a
+    text is the sum of its token vectors, so texts sharing words land close together.
+    Used by benchmarks and load tests so results reflect the serving stack, not model speed.
+    """
+
+    def __init__(self, dims: int = STUB_DIMS):
+        self.dims = dims
+        self._token_vectors: Dict[str, np.ndarray] = {}
+
+    def _token_vector(self, token: str) -> np.ndarray:
+        vec = self._token_vectors.get(token)
+        if vec is None:
+            rng = np.random.default_rng(zlib.crc32(token.encode()))
+            vec = rng.standard_normal(self.dims).astype(np.float32)
+            self._token_vectors[token] = vec
+        return vec
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        normalize_embeddings: bool = False,
+        **kwargs
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        embeddings = np.zeros((len(sentences), self.dims), dtype=np.float32)
+        for i, text in enumerate(sentences):
+            for token in re.findall(r"\w+", text.lower()):
+                embeddings[i] += self._token_vector(token)
+
+        if normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+
+        return embeddings[0] if single else embeddings
@@ -0,0 +1,46 @@
+import streamlit as st
+from storage.db import get_recent_books, get_database_stats, get_books_by_ids, get_book_ids_by_genres, get_book_neighbors
+from storage.version import get_catalog_version
+
+# Upper bound on staleness if a pipeline run happens without bumping the version
+CACHE_TTL_SECONDS = 600
+
+# Every wrapper takes the catalog version as an argument so a pipeline run
+# (which writes a new version stamp) becomes a cache miss on the next rerun.
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def _database_stats(version):
+    return get_database_stats()
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def _recent_books(limit, version):
+    return get_recent_books(limit=limit)
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False, max_entries=1000)
+def _books_by_ids(ids, version):
+    return get_books_by_ids(list(ids), aligned=True)
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False, max_entries=200)
+def _book_ids_by_genres(genres, version):
+    return get_book_ids_by_genres(list(genres))
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False, max_entries=500)
+def _similar_books(book_id, limit, version):
+    neighbors = get_book_neighbors(book_id, limit)
+    books = get_books_by_ids([neighbor_id for neighbor_id, _ in neighbors], aligned=True)
+    return [(book, score) for book, (_, score) in zip(books, neighbors) if book]
+
+def cached_database_stats():
+    return _database_stats(get_catalog_version())
+
+def cached_recent_books(limit=4):
+    return _recent_books(limit, get_catalog_version())
+
+def cached_books_by_ids(ids):
+    return _books_by_ids(tuple(ids), get_catalog_version())
+
+def cached_book_ids_by_genres(genres):
+    return _book_ids_by_genres(tuple(sorted(genres)), get_catalog_version())
+
+def cached_similar_books(book_id, limit=8):
+    return _similar_books(book_id, limit, get_catalog_version())
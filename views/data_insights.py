@@ -1,5 +1,5 @@
 import streamlit as st
-from storage.db import get_database_stats
+from views.cached_data import cached_database_stats
 
 def render_data_insights():
     st.markdown("""
@@ -9,7 +9,7 @@ def render_data_insights():
         </div>
     """, unsafe_allow_html=True)
     
-    stats = get_database_stats()
+    stats = cached_database_stats()
     
     # Book Collection Landscape Section
     st.markdown("## 📊 Book Collection Landscape")
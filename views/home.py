@@ -1,89 +1,241 @@
 import streamlit as st
-import numpy as np
+import threading
+import logging
 import os
 import sys
 
 # Ensure storage module can be found if needed, though app.py usually handles sys.path
 # But imports should work if running from root
-from storage.db import get_recent_books, get_database_stats, get_books_by_ids, get_book_ids_by_genres
-from transformation.embedder import load_model, load_embeddings
-from sklearn.metrics.pairwise import cosine_similarity
+from storage.version import get_catalog_version, get_catalog_versions
+from views.cached_data import cached_database_stats, cached_recent_books, cached_books_by_ids, cached_book_ids_by_genres, cached_similar_books
+from search.api_client import SEARCH_MODE, API_MAX_RESULTS, search_page_via_api
+
+# Configure logging
+logger = logging.getLogger(__name__)
 
 # --- RESOURCE LOADING ---
-@st.cache_resource
+# numpy / torch / the embedder are imported inside the warm-up thread so that
+# importing this module (which app.py does for every page) stays cheap.
+@st.cache_resource(max_entries=1)
+def _search_warmup(index_version):
+    """
+    Starts loading the model and embeddings in a background thread, once per
+    process and index version. Returns a holder filled in when loading finishes.
+    """
+    holder = {"model": None, "embeddings_data": None, "ready": threading.Event()}
+
+    def _load():
+        try:
+            from transformation.embedder import load_model, load_embeddings
+            holder["model"] = load_model()
+            holder["embeddings_data"] = load_embeddings()
+        except Exception:
+            logger.exception("Search warm-up failed; semantic search is unavailable")
+            holder["model"], holder["embeddings_data"] = None, None
+        finally:
+            holder["ready"].set()
+
+    threading.Thread(target=_load, name="search-warmup", daemon=True).start()
+    return holder
+
+def start_search_warmup():
+    """
+    Returns the warm-up holder for the current embedding index,
+    reloading in the background after a pipeline run re-embeds the catalog.
+    Lookup indexes derived from the catalog are (re)built in the background too.
+    """
+    _trigram_index().get(wait=False)
+    _prefix_index().get(wait=False)
+    return _search_warmup(get_catalog_versions()["index"])
+
 def load_search_resources():
-    try:
-        model = load_model()
-        embeddings_data = load_embeddings()
-        return model, embeddings_data
-    except Exception as e:
-        return None, None
+    """
+    Blocks until the warm-up thread has finished; only search paths call this.
+    """
+    holder = start_search_warmup()
+    holder["ready"].wait()
+    return holder["model"], holder["embeddings_data"]
+
+@st.cache_resource
+def _trigram_index():
+    """
+    Fuzzy title/author index shared by all sessions. It is built off the request path
+    (like the API's) and rebuilt in the background when the catalog version changes.
+    """
+    from storage.version import VersionedResource
+    from search.fuzzy_index import build_trigram_index
+    return VersionedResource("trigram index", build_trigram_index)
+
+@st.cache_resource
+def _prefix_index():
+    """
+    Typeahead index over titles, authors and genres, built and rebuilt in the
+    background like the trigram index.
+    """
+    from storage.version import VersionedResource
+    from search.suggest_index import build_prefix_index
+    return VersionedResource("prefix index", build_prefix_index)
+
+# Completions offered by the typeahead box; the browser filters them as the user types
+TYPEAHEAD_OPTIONS = 5000
+
+@st.cache_data(max_entries=1)
+def _typeahead_options(index_version, _index):
+    # Keyed on the version the index was built for (streamlit doesn't hash _index)
+    return [s['text'] for s in _index.popular(TYPEAHEAD_OPTIONS)]
 
-model, embeddings_data = load_search_resources()
+def typeahead_options():
+    """
+    The most popular titles/authors/genres, or [] while the index is first being built.
+    """
+    resource = _prefix_index()
+    index = resource.get(wait=False)
+    if index is None:
+        return []
+    return _typeahead_options(resource.version, index)
 
 def semantic_search(query_text, top_k=5):
-    if not embeddings_data or not model: return [], []
+    """
+    Returns (ids, scores, candidate vectors) for the top_k matches, best first.
+    """
+    import numpy as np
+    from search.vector_index import search_vectors, candidate_vectors
+    from search.ranking import boost_entity_matches
+    from search.query_understanding import detect_genres
+
+    model, embeddings_data = load_search_resources()
+    if not embeddings_data or not model: return [], [], None
     
     # 1. Hard Genre Filtering
-    query_lower = query_text.lower()
-    
-    # Map common keywords to DB genre substrings
-    genre_keywords = {
-        "thriller": ["thriller", "suspense", "mystery", "crime"],
-        "mystery": ["mystery", "crime", "detective", "thriller"],
-        "romance": ["romance", "love"],
-        "scifi": ["sci-fi", "science fiction", "futuristic", "space"],
-        "science fiction": ["sci-fi", "science fiction"],
-        "fantasy": ["fantasy", "magic"],
-        "history": ["history", "biography", "historical"],
-        "biography": ["biography", "memoir"],
-        "horror": ["horror", "scary"],
-        "psychological": ["psychological", "thriller"],
-        "programming": ["programming", "code", "software", "computer"],
-        "tech": ["technology", "computer"],
-    }
-    
-    target_genres = set()
-    for keyword, mapped_genres in genre_keywords.items():
-        if keyword in query_lower:
-            target_genres.update(mapped_genres)
+    target_genres = detect_genres(query_text)
             
     candidate_indices = None
     all_ids = np.array(embeddings_data['ids'])
     
     if target_genres:
         # Fetch matching IDs from DB
-        filtered_ids_list = get_book_ids_by_genres(list(target_genres))
+        filtered_ids_list = cached_book_ids_by_genres(target_genres)
         if not filtered_ids_list:
              # Strict filtering: if genre keywords present but no books match, return empty
              # Or could fallback, but user requested "restrict".
-             return [], []
+             return [], [], None
              
         valid_ids_set = set(filtered_ids_list)
         # Find indices of these IDs in the embedding matrix
         # This mask approach fits into memory for typical catalog sizes
         mask = [bid in valid_ids_set for bid in all_ids]
         if not any(mask):
-            return [], []
+            return [], [], None
         
         candidate_indices = np.where(mask)[0]
-        candidate_embeddings = embeddings_data['embeddings'][candidate_indices]
-        candidate_ids = all_ids[candidate_indices]
-    else:
-        candidate_embeddings = embeddings_data['embeddings']
-        candidate_ids = all_ids
 
     # 2. Normalize Query & Compute Similarity
     # normalize_embeddings=True ensures query is unit vector
-    query_embedding = model.encode([query_text], normalize_embeddings=True)
+    query_embedding = model.encode([query_text], normalize_embeddings=True)[0]
     
     # Cosine similarity on normalized vectors = Dot product
-    # But sklearn cosine_similarity handles it generally
-    scores = cosine_similarity(query_embedding, candidate_embeddings)[0]
+    # Quantized matrices are scanned first, then rescored at full precision
+    top_k_indices, scores = search_vectors(embeddings_data, query_embedding, top_k, candidate_indices)
+
+    # Queries naming a title or author (even misspelled) pull that book up;
+    # skipped until the index's first background build finishes
+    trigram_index = _trigram_index().get(wait=False)
+    matches = trigram_index.lookup(query_text, limit=5) if trigram_index else []
+    top_k_indices, scores = boost_entity_matches(
+        embeddings_data, all_ids, query_embedding, top_k_indices, scores, matches, candidate_indices
+    )
     
-    # 3. Rank
-    top_k_indices = np.argsort(scores)[::-1][:top_k]
-    return candidate_ids[top_k_indices].tolist(), scores[top_k_indices]
+    # 3. Rank (vectors are returned for MMR re-ranking)
+    return all_ids[top_k_indices].tolist(), scores, candidate_vectors(embeddings_data, top_k_indices)
+
+# --- SESSION RESULT CACHE ---
+RESULTS_PAGE_SIZE = 8
+# "More like this" books shown under a book's details
+SIMILAR_BOOKS_COUNT = 8
+
+def _session_search(query_text):
+    """
+    Returns this session's cached search state for the query, ranking on a miss.
+    The entry is keyed on the catalog version so a pipeline run invalidates it.
+    """
+    key = (query_text, get_catalog_version())
+    cache = st.session_state.get('search_cache')
+    if cache and cache['key'] == key:
+        return cache
+
+    cache = {
+        "key": key,
+        "results": [],        # MMR-ordered, de-duplicated (book, score) pairs
+        "shown": RESULTS_PAGE_SIZE,
+        "exhausted": False,
+        "failed": False,
+        "next_offset": 0,     # where the next page starts (in the API's or the local ranking)
+        "seen": set(),        # title+author / ISBN keys already in results
+        "ranked": None,       # in-process: MMR-ordered (ids, scores), hydrated a page at a time
+    }
+
+    if SEARCH_MODE != "api":
+        model, embeddings_data = load_search_resources()
+        if not (embeddings_data and model):
+            cache['failed'] = True
+        else:
+            from search.ranking import mmr_order, RESULTS_DEPTH
+            ids, scores, vectors = semantic_search(query_text, top_k=RESULTS_DEPTH)
+            # One MMR pass per query; books are only read for the pages actually shown
+            order = mmr_order(vectors, scores, len(ids)) if len(ids) else []
+            cache['ranked'] = ([ids[i] for i in order], [float(scores[i]) for i in order])
+            cache['exhausted'] = not len(order)
+
+    st.session_state.search_cache = cache
+    return cache
+
+def run_search(query_text, limit):
+    """
+    Returns the first `limit` ranked, de-duplicated (book, score) pairs,
+    or None if the search engine is unavailable.
+    - SEARCH_MODE=api delegates to the shared FastAPI service
+    - otherwise the model and embeddings are used in-process
+    Results are cached per session, so reruns and "Load more" don't search again.
+    """
+    cache = _session_search(query_text)
+    if cache['failed']:
+        return None
+
+    from search.ranking import unique_books
+    # Pages of the ranking (fixed per query) are appended, never re-requested
+    while len(cache['results']) < limit and not cache['exhausted']:
+        count = max(limit - len(cache['results']), RESULTS_PAGE_SIZE)
+        start = cache['next_offset']
+        if SEARCH_MODE == "api":
+            # The API detects genre filters in the query itself (same parser)
+            page = search_page_via_api(query_text, min(count, API_MAX_RESULTS), start)
+            if page is None:
+                if not cache['results']:
+                    return None
+                break
+            books = page.get('results', [])
+            scores = [b.get('score') or 0.0 for b in books]
+            cache['next_offset'] = page.get('next_offset')
+        else:
+            ids, ranked_scores = cache['ranked']
+            books = cached_books_by_ids(ids[start:start + count])
+            scores = ranked_scores[start:start + count]
+            cache['next_offset'] = start + count if start + count < len(ids) else None
+
+        for book in unique_books(books, scores, cache['seen']):
+            cache['results'].append((book, book['score']))
+        cache['exhausted'] = cache['next_offset'] is None
+
+    return cache['results'][:limit]
+
+def has_more_results():
+    cache = st.session_state.get('search_cache')
+    if not cache:
+        return False
+    return cache['shown'] < len(cache['results']) or not cache['exhausted']
+
+def load_more_results():
+    st.session_state.search_cache['shown'] += RESULTS_PAGE_SIZE
 
 # --- HELPER FUNCTIONS ---
 def view_book_details(book):
@@ -98,6 +250,11 @@ def go_back():
 def update_query():
     st.session_state.query = st.session_state.search_input
 
+def apply_typeahead():
+    if st.session_state.typeahead:
+        st.session_state.query = st.session_state.typeahead
+    st.session_state.typeahead = None
+
 def search_by_genre(genre):
     """Trigger search for a specific genre"""
     st.session_state.query = f"{genre} books"
@@ -129,6 +286,34 @@ def render_home():
                 
                 st.markdown("---")
                 st.caption(f"Source ID: {book.get('id')}")
+
+            # More like this (precomputed neighbours, one indexed read)
+            similar = cached_similar_books(book['id'], SIMILAR_BOOKS_COUNT)
+            if similar:
+                st.markdown("---")
+                st.markdown("#### More Like This")
+                batch_size = 4
+                for i in range(0, len(similar), batch_size):
+                    cols = st.columns(batch_size)
+                    for j, (other, score) in enumerate(similar[i:i + batch_size]):
+                        with cols[j]:
+                            with st.container(border=True):
+                                if other.get('cover_image'):
+                                    st.markdown(f"""
+                                    <div style="height:200px; width:100%; overflow:hidden; border-radius:8px; margin-bottom:10px;">
+                                        <img src="{other['cover_image']}" style="width:100%; height:100%; object-fit:cover; object-position:top;">
+                                    </div>
+                                    """, unsafe_allow_html=True)
+                                else:
+                                    st.markdown(f"<div style='height:200px; background-color:#21262d; color:#8b949e; display:flex; align-items:center; justify-content:center; border-radius:8px; margin-bottom:10px;'>{(other.get('title') or '')[:15]}...</div>", unsafe_allow_html=True)
+                                st.markdown(f"""
+                                    <div style="min-height: 80px;">
+                                        <div class="title-text" style="height: 48px; overflow: hidden; display: -webkit-box; -webkit-line-clamp: 2; -webkit-box-orient: vertical;" title="{other.get('title')}">{other.get('title')}</div>
+                                        <div class="author-text" style="height: 24px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap;">{other.get('author') or 'Unknown'}</div>
+                                    </div>
+                                """, unsafe_allow_html=True)
+                                st.caption(f"● Similarity {score:.0%}")
+                                st.button("View Details", key=f"similar_{other['id']}", on_click=view_book_details, args=(other,))
             
     else:
         # --- LIST PAGE (HERO & SEARCH) ---
@@ -153,13 +338,27 @@ def render_home():
                 value=st.session_state.query,
                 on_change=update_query
             )
+
+            # Typeahead: st.text_input only reports on Enter, so completions come from a
+            # searchable select box that filters popular entries on every keystroke
+            options = typeahead_options()
+            if options:
+                st.selectbox(
+                    "Jump to a title, author or genre",
+                    options,
+                    index=None,
+                    placeholder="Or jump to a title, author or genre...",
+                    label_visibility="collapsed",
+                    key="typeahead",
+                    on_change=apply_typeahead
+                )
         
         st.write("") # Spacer
 
         # Only show home content when no search query
         if not st.session_state.query:
             # Stats Widgets
-            stats = get_database_stats()
+            stats = cached_database_stats()
             
             col1, col2, col3 = st.columns(3)
             
@@ -194,7 +393,7 @@ def render_home():
             """, unsafe_allow_html=True)
             
             # Get random recent books as "featured"
-            recent_books = get_recent_books(limit=4)
+            recent_books = cached_recent_books(limit=4)
             if recent_books:
                 cols = st.columns(4)
                 for i, book in enumerate(recent_books):
@@ -262,77 +461,55 @@ def render_home():
                     st.rerun()
             st.markdown("---")
             
-            if embeddings_data and model:
-                with st.spinner("Analyzing semantic meaning..."):
-                    limit = 8
-                    # Fetch 3x candidates to ensure enough unique results after dedup
-                    ids, scores = semantic_search(query, top_k=limit * 3)
-                
-                if ids:
-                    st.markdown(f"##### Best Matches")
-                    # Books Fetch
-                    books = get_books_by_ids(ids)
-                    book_map = {b['id']: b for b in books}
-                    ordered_books = [book_map[id] for id in ids if id in book_map]
-
-                    # De-dup logic
-                    seen_isbns = set()
-                    seen_titles = set()
-                    unique_books = []
-                    unique_scores = []
-
-                    for b, s in zip(ordered_books, scores):
-                        if len(unique_books) >= limit: break # Stop once we have enough
-                        
-                        isbn = b.get('isbn')
-                        t = (b.get('title') or "").lower().strip()
-                        a = (b.get('author') or "").lower().strip()
-                        key = (t,a)
-                        if isbn and isbn in seen_isbns: continue
-                        if key in seen_titles: continue
-                        if isbn: seen_isbns.add(isbn)
-                        if t: seen_titles.add(key)
-                        unique_books.append(b)
-                        unique_scores.append(s)
-
-                    # Grid Render
-                    # Use batching to ensure rows are aligned (grid) instead of masonry (columns)
-                    batch_size = 4
-                    results = list(zip(unique_books, unique_scores))
+            with st.spinner("Analyzing semantic meaning..."):
+                shown = _session_search(query)['shown']
+                results = run_search(query, limit=shown)
+
+            if results is None:
+                st.error("Search engine unavailable.")
+            elif results:
+                st.markdown(f"##### Best Matches")
+
+                # Grid Render
+                # Use batching to ensure rows are aligned (grid) instead of masonry (columns)
+                batch_size = 4
+                for i in range(0, len(results), batch_size):
+                    batch = results[i:i + batch_size]
+                    cols = st.columns(batch_size)
                     
-                    for i in range(0, len(results), batch_size):
-                        batch = results[i:i + batch_size]
-                        cols = st.columns(batch_size)
-                        
-                        for j, (book, score) in enumerate(batch):
-                            with cols[j]:
-                                with st.container(border=True): # Uses card css
-                                    # Image
-                                    if book.get('cover_image'):
-                                        try:
-                                            st.markdown(f"""
-                                            <div style="height:280px; width:100%; overflow:hidden; border-radius:8px; margin-bottom:10px;">
-                                                <img src="{book['cover_image']}" style="width:100%; height:100%; object-fit:cover; object-position:top;">
-                                            </div>
-                                            """, unsafe_allow_html=True)
-                                        except:
-                                            st.markdown("<div style='height:280px; background:#21262d; border-radius:8px; margin-bottom:10px;'></div>", unsafe_allow_html=True)
-                                    else:
-                                        st.markdown(f"<div style='height:280px; background-color:#21262d; color:#8b949e; display:flex; align-items:center; justify-content:center; border-radius:8px; margin-bottom:10px;'>{book.get('title')[:15]}...</div>", unsafe_allow_html=True)
-                                    
-                                    # Content Container for alignment - Fixed Height for Text
-                                    st.markdown(f"""
-                                        <div style="flex-grow:1; min-height: 120px;">
-                                            <div class="title-text" style="height: 48px; overflow: hidden; display: -webkit-box; -webkit-line-clamp: 2; -webkit-box-orient: vertical;" title="{book.get('title')}">{book.get('title')}</div>
-                                            <div class="author-text" style="height: 24px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap;">{book.get('author') or 'Unknown'}</div>
+                    for j, (book, score) in enumerate(batch):
+                        with cols[j]:
+                            with st.container(border=True): # Uses card css
+                                # Image
+                                if book.get('cover_image'):
+                                    try:
+                                        st.markdown(f"""
+                                        <div style="height:280px; width:100%; overflow:hidden; border-radius:8px; margin-bottom:10px;">
+                                            <img src="{book['cover_image']}" style="width:100%; height:100%; object-fit:cover; object-position:top;">
                                         </div>
-                                    """, unsafe_allow_html=True)
-                                    
-                                    match_color = "#238636" if score > 0.5 else "#d29922"
-                                    st.markdown(f"<span style='color:{match_color}; font-size:0.8rem'>● Match {score:.0%}</span>", unsafe_allow_html=True)
-                                    
-                                    st.button("View Details", key=f"btn_{book['id']}", on_click=view_book_details, args=(book,))
-                else:
-                    st.warning("No matches found.")
+                                        """, unsafe_allow_html=True)
+                                    except:
+                                        st.markdown("<div style='height:280px; background:#21262d; border-radius:8px; margin-bottom:10px;'></div>", unsafe_allow_html=True)
+                                else:
+                                    st.markdown(f"<div style='height:280px; background-color:#21262d; color:#8b949e; display:flex; align-items:center; justify-content:center; border-radius:8px; margin-bottom:10px;'>{book.get('title')[:15]}...</div>", unsafe_allow_html=True)
+                                
+                                # Content Container for alignment - Fixed Height for Text
+                                st.markdown(f"""
+                                    <div style="flex-grow:1; min-height: 120px;">
+                                        <div class="title-text" style="height: 48px; overflow: hidden; display: -webkit-box; -webkit-line-clamp: 2; -webkit-box-orient: vertical;" title="{book.get('title')}">{book.get('title')}</div>
+                                        <div class="author-text" style="height: 24px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap;">{book.get('author') or 'Unknown'}</div>
+                                    </div>
+                                """, unsafe_allow_html=True)
+                                
+                                match_color = "#238636" if score > 0.5 else "#d29922"
+                                st.markdown(f"<span style='color:{match_color}; font-size:0.8rem'>● Match {score:.0%}</span>", unsafe_allow_html=True)
+                                
+                                st.button("View Details", key=f"btn_{book['id']}", on_click=view_book_details, args=(book,))
+
+                if has_more_results():
+                    st.write("")
+                    c1, c2, c3 = st.columns([1, 1, 1])
+                    with c2:
+                        st.button("Load more", key="load_more", on_click=load_more_results, use_container_width=True)
             else:
-                 st.error("Embeddings not loaded.")
+                st.warning("No matches found.")